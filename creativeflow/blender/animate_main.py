@@ -26,8 +26,6 @@ Capabilities:
 Uses Blender's rigid body simulator to animate objects in the input file and
 output a blend file with the animation.
 """
-import bpy
-
 import argparse
 import logging
 import math
@@ -90,7 +88,7 @@ if __name__ == "__main__":
             argv = argv[argv.index("--") + 1:]
         args = parser.parse_args(argv)
 
-        random.seed(time.time())
+        random.seed(int(time.time() * 1000000))
         render_util.set_width_height(1500, 1500)
 
         if args.set_env_lighting_image:
@@ -133,7 +131,7 @@ if __name__ == "__main__":
                     cam, objects[random.randint(0, len(objects) - 1)])
 
         # bpy.context.scene.world.light_settings.samples = 2
-        bpy.ops.file.pack_all()
+        geo_util.pack_images()
 
         print('Saving blend to %s' % args.output_blend.replace('.blend', '_unbaked.blend'))
         geo_util.save_blend(args.output_blend.replace('.blend', '_unbaked.blend'))
@@ -45,10 +45,12 @@ Sample invocation is:
         --npixels=2000
 """
 import argparse
+import concurrent.futures
+import fnmatch
 import glob
 import numpy as np
+import os
 import random
-from datetime import datetime
 from skimage.io import imread, imsave
 
 import flow_util
@@ -95,9 +97,13 @@ if __name__ == "__main__":
         '--max_occlusion_frac', action='store', type=float, default=-1.0,
         help='If set to nonzero value, will fail if average '
         '# occluded pixels / # nonzero alpha pixels is greater than this value.')
+    parser.add_argument(
+        '--early_stop_batch', action='store', type=int, default=0,
+        help='If positive, tests pixels of each frame in batches of this size and stops '
+        'testing the frame once its sanity is above or below --min_sanity with 99% confidence.')
     args = parser.parse_args()
 
-    random.seed(datetime.now())
+    random.seed()
 
     def _make_file_ob():
         return { 'flow': None,
@@ -117,6 +123,14 @@ if __name__ == "__main__":
         return (ob['objid'] is not None and
                 ob['corr'] is not None)
 
+    def _sanity_bounds(nsane, ntested, z=2.576):
+        # Wilson score interval for the sane fraction (z=2.576 for 99% confidence)
+        p = nsane / float(ntested)
+        denom = 1.0 + z * z / ntested
+        center = (p + z * z / (2.0 * ntested)) / denom
+        spread = z * np.sqrt(p * (1.0 - p) / ntested + z * z / (4.0 * ntested * ntested)) / denom
+        return center - spread, center + spread
+
     data = {}
 
     def _fill_data(files, datakey):
@@ -127,11 +141,37 @@ if __name__ == "__main__":
                     data[fnum_] = _make_file_ob()
                 data[fnum_][datakey] = f
 
-    _fill_data(glob.glob(args.flow_pattern), 'flow')
-    _fill_data(glob.glob(args.objectid_pattern), 'objid')
-    _fill_data(glob.glob(args.corresp_pattern), 'corr')
-    _fill_data(glob.glob(args.occlusion_pattern), 'occ')
-    _fill_data(glob.glob(args.alpha_pattern), 'alpha')
+    dir_listings = {}
+
+    def _glob_files(pattern):
+        # List each directory only once, even if several patterns share it
+        dirname, basename = os.path.split(pattern)
+        if glob.has_magic(dirname):
+            return glob.glob(pattern)
+        if dirname not in dir_listings:
+            try:
+                dir_listings[dirname] = [e.name for e in os.scandir(dirname or '.')]
+            except FileNotFoundError:
+                dir_listings[dirname] = []
+        return [os.path.join(dirname, f) for f in fnmatch.filter(dir_listings[dirname], basename)]
+
+    def _read_frame_data(fnum_):
+        # PNG decoding mostly releases the GIL, so the reads overlap
+        futures = {
+            'flow': io_pool.submit(io_util.read_flow, data[fnum_]['flow']),
+            'objid': io_pool.submit(imread, data[fnum_]['objid']),
+            'corr': io_pool.submit(imread, data[fnum_]['corr']),
+            'occ': io_pool.submit(imread, data[fnum_]['occ']),
+            'alpha': io_pool.submit(imread, data[fnum_]['alpha']),
+            'next_objid': io_pool.submit(imread, data[fnum_ + 1]['objid']),
+            'next_corr': io_pool.submit(imread, data[fnum_ + 1]['corr']) }
+        return { k: v.result() for k, v in futures.items() }
+
+    _fill_data(_glob_files(args.flow_pattern), 'flow')
+    _fill_data(_glob_files(args.objectid_pattern), 'objid')
+    _fill_data(_glob_files(args.corresp_pattern), 'corr')
+    _fill_data(_glob_files(args.occlusion_pattern), 'occ')
+    _fill_data(_glob_files(args.alpha_pattern), 'alpha')
 
     # Where next frame is also present
     legit_frames = [ k for k in data.keys() if
@@ -145,6 +185,7 @@ if __name__ == "__main__":
     # Check and count sanity ---------------------------------------------------
     sane_count = 0
     insane_count = 0
+    sampled_count = 0  # may be larger than tested count with --early_stop_batch
     num_frames_tested = 0
     occ_fraction_sum = 0
 
@@ -161,115 +202,121 @@ if __name__ == "__main__":
         legit_frames.sort()
     print('Evaluating sanity for %d frames out of: %s' % (args.nframes, str(legit_frames)))
 
-    for i in range(min(args.nframes, len(legit_frames))):
-        fnum = legit_frames[i]
-        flow = io_util.read_flow(data[fnum]['flow'])
-        objid = imread(data[fnum]['objid'])
-        corr = imread(data[fnum]['corr'])
-        occ = imread(data[fnum]['occ'])
-        alpha = imread(data[fnum]['alpha'])
-
-        next_objid = imread(data[fnum + 1]['objid'])
-        next_corr = imread(data[fnum + 1]['corr'])
-
-        # Select only non-transparent parts of the frame for a meaningful check
-        rows,cols = np.nonzero(alpha)
-        if rows.size == 0:
-            print('Skipping frame %d: no non-zero alphas' % fnum)
-            continue
-        idxes = np.random.choice(len(rows), min(len(rows), args.npixels), replace=False)
-
-        pixels_with_flow = np.sum(np.abs(flow) > 0.001)
-        if pixels_with_flow == 0:
-            print('Skipping frame %d: no pixels with nonzero flow' % fnum)
-
-        # Check occlusions
-        num_frames_tested += 1
-        if args.max_occlusion_frac > 0:
-            num_occluded = np.sum(np.logical_and(occ > 0, alpha > 0))
-            occ_fraction_sum += float(num_occluded) / len(rows)
-
-        # Check sanity
-        frame_sane_count = 0
-        frame_insane_count = 0
-        for ix in idxes:
-            row = rows[ix]
-            col = cols[ix]
-
-            is_sane = flow_util.cross_check_sanity(
-                flow, objid, next_objid, corr, next_corr, occ, row, col, verbose=True)
-
-            if not is_sane:
-                print('Frame %d, (row,col) = (%d,%d) is not sane' % (fnum, row, col))
-                insane_count += 1
-                frame_insane_count += 1
-            else:
-                sane_count += 1
-                frame_sane_count += 1
-        frame_sanity = frame_sane_count / max(1.0, 1.0 * (frame_sane_count + frame_insane_count))
-        print('Frame Sanity (fr %d) %0.2f: %d / %d' %
-              (fnum, frame_sanity, frame_sane_count, frame_sane_count + frame_insane_count))
-
-    test_count = sane_count + insane_count
-    expected_test_count = min(args.nframes, len(legit_frames)) * args.npixels
-    sanity = sane_count / (1.0 * test_count)
-    print('Sanity %0.2f: %d / %d' % (sanity, sane_count, test_count))
-
-    failed = (test_count < expected_test_count * 0.5) or (sanity < args.min_sanity)
-
-    # Optional diagnostics -----------------------------------------------------
-    if len(args.debug_output_file) > 0 and (not args.debug_only_on_failure or failed):
-        if args.debug_frame < 0:
-            args.debug_frame = legit_frames[0]
-
-        if args.debug_frame not in legit_frames:
-            raise RuntimeError(
-                'Cannot debug frame %d, not enough data. Use --debug_frame to set frame'
-                % args.debug_frame)
-
-        fnum = args.debug_frame
-
-        flow = io_util.read_flow(data[fnum]['flow'])
-        objid = imread(data[fnum]['objid'])
-        corr = imread(data[fnum]['corr'])
-        occ = imread(data[fnum]['occ'])
-        alpha = imread(data[fnum]['alpha'])
-
-        next_objid = imread(data[fnum + 1]['objid'])
-        next_corr = imread(data[fnum + 1]['corr'])
-
-        res = np.zeros((flow.shape[0], flow.shape[1], 3), np.uint8)
-
-        rows,cols = np.nonzero(alpha)
-        for ix in range(len(rows)):
-            row = rows[ix]
-            col = cols[ix]
-
-            sanity_type = flow_util.cross_check_sanity(
-                flow, objid, next_objid, corr, next_corr, occ, row, col,
-                output_sanity_type=True)
-            if sanity_type == 0:
-                res[row][col][1] = 255  # green
-            elif sanity_type == 1:
-                res[row][col][0] = 255  # white
-                res[row][col][1] = 255
-                res[row][col][2] = 255
-            elif sanity_type == 2:
-                res[row][col][0] = 255  # yellow
-                res[row][col][1] = 255
-            elif sanity_type == 3:
-                res[row][col][0] = 255  # orange
-                res[row][col][1] = 150
-            elif sanity_type == 4:
-                res[row][col][0] = 255  # red
-
-        imsave(args.debug_output_file, res)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as io_pool:
+        for i in range(min(args.nframes, len(legit_frames))):
+            fnum = legit_frames[i]
+            frame_data = _read_frame_data(fnum)
+            flow = frame_data['flow']
+            objid = frame_data['objid']
+            corr = frame_data['corr']
+            occ = frame_data['occ']
+            alpha = frame_data['alpha']
+
+            next_objid = frame_data['next_objid']
+            next_corr = frame_data['next_corr']
+
+            # Select only non-transparent parts of the frame for a meaningful check
+            rows,cols = np.nonzero(alpha)
+            if rows.size == 0:
+                print('Skipping frame %d: no non-zero alphas' % fnum)
+                continue
+            # Sampling from a range only touches the selected indices, unlike
+            # np.random.choice(..., replace=False), which permutes all of them
+            idxes = np.array(random.sample(range(len(rows)), min(len(rows), args.npixels)),
+                             dtype=np.int64)
+
+            pixels_with_flow = np.sum(np.abs(flow) > 0.001)
+            if pixels_with_flow == 0:
+                print('Skipping frame %d: no pixels with nonzero flow' % fnum)
+
+            # Check occlusions
+            num_frames_tested += 1
+            if args.max_occlusion_frac > 0:
+                num_occluded = np.sum(np.logical_and(occ > 0, alpha > 0))
+                occ_fraction_sum += float(num_occluded) / len(rows)
+
+            # Check sanity
+            batch_size = args.early_stop_batch if args.early_stop_batch > 0 else len(idxes)
+            frame_sane_count = 0
+            frame_insane_count = 0
+            for start in range(0, len(idxes), batch_size):
+                batch_idxes = idxes[start:start + batch_size]
+                sanity_types = flow_util.cross_check_sanity_batch(
+                    flow, objid, next_objid, corr, next_corr, occ, rows[batch_idxes], cols[batch_idxes])
+                for ix in np.nonzero(sanity_types)[0]:
+                    row = rows[batch_idxes[ix]]
+                    col = cols[batch_idxes[ix]]
+                    # Rechecks the few insane pixels one at a time to print why they failed
+                    flow_util.cross_check_sanity(
+                        flow, objid, next_objid, corr, next_corr, occ, row, col, verbose=True)
+                    print('Frame %d, (row,col) = (%d,%d) is not sane (type %d)' %
+                          (fnum, row, col, sanity_types[ix]))
+                batch_sane_count = int(np.sum(sanity_types == 0))
+                frame_sane_count += batch_sane_count
+                frame_insane_count += len(sanity_types) - batch_sane_count
+
+                if args.early_stop_batch > 0:
+                    lower, upper = _sanity_bounds(frame_sane_count, frame_sane_count + frame_insane_count)
+                    if lower > args.min_sanity or upper < args.min_sanity:
+                        print('Frame %d sanity is in [%0.2f, %0.2f]; stopping after %d pixels' %
+                              (fnum, lower, upper, frame_sane_count + frame_insane_count))
+                        break
+            sampled_count += len(idxes)
+            sane_count += frame_sane_count
+            insane_count += frame_insane_count
+            frame_sanity = frame_sane_count / max(1.0, 1.0 * (frame_sane_count + frame_insane_count))
+            print('Frame Sanity (fr %d) %0.2f: %d / %d' %
+                  (fnum, frame_sanity, frame_sane_count, frame_sane_count + frame_insane_count))
+
+        test_count = sane_count + insane_count
+        expected_test_count = min(args.nframes, len(legit_frames)) * args.npixels
+        sanity = sane_count / (1.0 * test_count)
+        print('Sanity %0.2f: %d / %d' % (sanity, sane_count, test_count))
+
+        failed = (sampled_count < expected_test_count * 0.5) or (sanity < args.min_sanity)
+
+        # Optional diagnostics -----------------------------------------------------
+        if len(args.debug_output_file) > 0 and (not args.debug_only_on_failure or failed):
+            if args.debug_frame < 0:
+                args.debug_frame = legit_frames[0]
+
+            if args.debug_frame not in legit_frames:
+                raise RuntimeError(
+                    'Cannot debug frame %d, not enough data. Use --debug_frame to set frame'
+                    % args.debug_frame)
+
+            fnum = args.debug_frame
+            frame_data = _read_frame_data(fnum)
+            flow = frame_data['flow']
+            objid = frame_data['objid']
+            corr = frame_data['corr']
+            occ = frame_data['occ']
+            alpha = frame_data['alpha']
+
+            next_objid = frame_data['next_objid']
+            next_corr = frame_data['next_corr']
+
+            res = np.zeros((flow.shape[0], flow.shape[1], 3), np.uint8)
+
+            rows,cols = np.nonzero(alpha)
+            sanity_types = flow_util.cross_check_sanity_batch(
+                flow, objid, next_objid, corr, next_corr, occ, rows, cols)
+
+            # Debug color for each sanity type
+            colors = np.array([[0, 255, 0],  # green
+                               [255, 255, 255],  # white
+                               [255, 255, 0],  # yellow
+                               [255, 150, 0],  # orange
+                               [255, 0, 0]], dtype=np.uint8)  # red
+            res[rows, cols] = colors[sanity_types]
+
+            imsave(args.debug_output_file, res)
 
     # Perform the actual test --------------------------------------------------
-    if test_count < expected_test_count * 0.5:
+    if sampled_count < expected_test_count * 0.5:
         raise RuntimeError(
             'Less than 50%% of expected number of frames tested: %d vs %d\n (Alphas: %s)' %
-            (expected_test_count, test_count, args.alpha_pattern))
+            (expected_test_count, sampled_count, args.alpha_pattern))
 
     if sanity < args.min_sanity:
         raise RuntimeError(
@@ -3,24 +3,25 @@ Color-related utilities that are specific to Creative Flow data generation pipel
 or color selection from a list of color themes mined online, etc.
 """
 
-import random
 import colorsys
+import functools
+import itertools
+import random
 
 
 def parse_hsv_bounds(hbound_str, sbound_str, vbound_str):
     def _parse_vals(in_str):
-        v = [float(x) for x in hbound_str.strip().split(',')]
+        v = [float(x) for x in in_str.strip().split(',')]
         if len(v) != 2:
             raise RuntimeError('Invalid CSV value of two numbers: %s' % in_str)
-        if v[0] > 1.0 or v[0] < 0.0 or v[1] > 1.0 or v[1] < 0.0:
+        if not (0.0 <= v[0] <= 1.0 and 0.0 <= v[1] <= 1.0):
             raise RuntimeError('HSV values must be in range [0,1], got %s' % in_str)
         return v
 
     try:
-        h_val = _parse_vals(hbound_str)
-        s_val = _parse_vals(sbound_str)
-        v_val = _parse_vals(vbound_str)
-        return {'hue': h_val, 'sat': s_val, 'val': v_val}
+        return {'hue': _parse_vals(hbound_str),
+                'sat': _parse_vals(sbound_str),
+                'val': _parse_vals(vbound_str)}
     except Exception as e:
         raise RuntimeError('Failed to parse HSV bounds with error %s' % str(e))
 
@@ -54,14 +55,13 @@ def make_color_getter_from_choices(choices):
     print('Color choices:')
     print(choices)
 
+    nchoices = len(choices)
+
     def get_color():
-        res = choices[random.randint(0, len(choices) - 1)]
-        return res
+        return choices[random.randrange(nchoices)]
 
-    def get_color_norep():
-        get_color_norep.index = (get_color_norep.index + 1) % len(choices)
-        return choices[get_color_norep.index]
-    get_color_norep.index = 0
+    # Cycles through choices, starting with the second one
+    get_color_norep = functools.partial(next, itertools.cycle(choices[1:] + choices[:1]))
 
     return get_color if random.random() > 0.5 else get_color_norep
 
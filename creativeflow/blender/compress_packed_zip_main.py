@@ -21,12 +21,16 @@ if __name__ == "__main__":
     parser.add_argument(
         '--input_dir', action='store', type=str, required=True,
         help='Directory containing input flows or images.')
+    parser.add_argument(
+        '--compress_level', action='store', type=int, default=None,
+        help='Deflate level (1-9) for the zip, or 0 to store uncompressed; zlib default if not set.')
     args = parser.parse_args()
 
     if args.input_type == 'FLOW':
-        io_util.compress_flows(args.input_dir, args.output_zip)
+        io_util.compress_flows(args.input_dir, args.output_zip, compresslevel=args.compress_level)
     elif args.input_type == 'PNG':
-        io_util.compress_images(args.input_dir, args.output_zip, read_function=skimage.io.imread)
+        io_util.compress_images(args.input_dir, args.output_zip, read_function=skimage.io.imread,
+                                compresslevel=args.compress_level)
     else:
         raise RuntimeError('Unrecognized --input_type=%s . Must use FLOW or PNG.' %
                            args.input_type)
@@ -13,6 +13,8 @@ import io_util
 import glob
 import os
 import numpy as np
+import shutil
+import tempfile
 from skimage.io import imread
 
 import argparse
@@ -39,75 +41,73 @@ if __name__ == "__main__":
     elif len(args.flowzip) > 0 and len(args.flowdir) > 0:
         raise RuntimeError('Must only set one of --flowzip or --flowdir')
 
-    F = []
-    fnames = []
-    nflows = []
+    # Flows are streamed one at a time, whether they come from zip or dir
     if len(args.flowzip) > 0:
-        F = io_util.decompress_flows(args.flowzip)
-        nflows = len(F)
-        print('Read %d flows from zip' % nflows)
+        flows = io_util.iter_decompressed_flows(args.flowzip)
+        print('Reading flows from zip %s' % args.flowzip)
     else:
         fnames = glob.glob(os.path.join(args.flowdir, '*.flo'))
         fnames.sort()
-        nflows = len(fnames)
-        print('Found %d flow files' % nflows)
+        flows = (io_util.read_flow(f) for f in fnames)
+        print('Found %d flow files' % len(fnames))
 
     thresh = 0.1
     motion_frames = 0
     motion_pixels = 0
-    lines = []
     bins = []
     # Bins in terms of frame max percent
     perc_bins = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 20, 30, 40, 50.0], dtype=np.float32)
     width = 0
     height = 0
-    for i in range(nflows):
-        if len(F) > 0:
-            flow = F[i]
-        else:
-            flow = io_util.read_flow(fnames[i])
+    mag2 = np.empty((0, 0), dtype=np.float32)  # squared magnitudes, reused across frames
+    nflows = 0
+    # Frame lines follow a header with totals, so they are spooled until the end
+    with tempfile.TemporaryFile(mode='w+') as frame_lines:
+        for i, flow in enumerate(flows):
+            nflows += 1
+            if len(args.objiddir) > 0:
+                obj_file = os.path.join(args.objiddir, 'objectid%06d.png' % (i+1))
+                if not os.path.isfile(obj_file):
+                    raise RuntimeError('Could not find %s' % obj_file)
 
-        if len(args.objiddir) > 0:
-            obj_file = os.path.join(args.objiddir, 'objectid%06d.png' % (i+1))
-            if not os.path.isfile(obj_file):
-                raise RuntimeError('Could not find %s' % obj_file)
+                ids = imread(obj_file)
+                has_id = ids[:, :, 0:3].any(axis=2)  # In case RGBA
+                flow[~has_id] = 0
 
-            ids = imread(obj_file)
-            ids = ids[:, :, 0:3]  # In case RGBA
-            ids = np.sum(ids, axis=2)
-            mult = np.zeros(ids.shape, dtype=flow.dtype)
-            mult[ids > 0] = 1.0
-            flow = flow * np.expand_dims(mult, axis=2)
+            width = flow.shape[0]
+            height = flow.shape[1]
+            npixels = float(flow.shape[0] * flow.shape[1])
+            if mag2.shape != flow.shape[0:2]:
+                mag2 = np.empty(flow.shape[0:2], dtype=np.float32)
+            # Thresholds are compared on squared magnitudes; sqrt only where needed
+            np.einsum('ijk,ijk->ij', flow, flow, out=mag2)
+            max_val = np.sqrt(np.max(mag2))
+            nmoving = np.sum(mag2 > thresh * thresh)
+            if nmoving > 0:
+                fbins = perc_bins / 100.0 * max(width, height)
+                bins = np.array([thresh] + fbins.tolist())
+                final_bins = bins[bins < max_val].tolist() + [max_val]
+                print(final_bins)
+                moving_mag = np.sqrt(mag2[mag2 >= thresh * thresh])
+                hist, _ = np.histogram(moving_mag, range=(thresh, max_val),
+                                       bins=final_bins)
+                motion_frames += 1
+                motion_pixels += nmoving / npixels
+            else:
+                hist = np.array([], dtype=np.int64)
+            hist = hist.tolist()
+            if len(hist) < len(perc_bins) + 3:
+                hist = hist + [0 for x in range(len(perc_bins) + 3 - len(hist))]
+            line = 'F%d %0.5f %s' % (i+1, nmoving / npixels * 100, ' '.join(map(str, hist)))
+            frame_lines.write(line + '\n')
+            print(line)
 
-        width = flow.shape[0]
-        height = flow.shape[1]
-        npixels = float(flow.shape[0] * flow.shape[1])
-        magnitudes = np.sqrt(np.sum(np.square(flow), axis=2))
-        max_val = np.max(magnitudes)
-        nmoving = np.sum(magnitudes > thresh)
-        if nmoving > 0:
-            fbins = perc_bins / 100.0 * max(width, height)
-            bins = np.array([thresh] + fbins.tolist())
-            final_bins = bins[bins < max_val].tolist() + [max_val]
-            print(final_bins)
-            hist, _ = np.histogram(magnitudes, range=(thresh, max_val),
-                                   bins=final_bins)
-            motion_frames += 1
-            motion_pixels += nmoving / npixels
-        else:
-            hist = np.array([], dtype=np.int64)
-        hist = hist.tolist()
-        if len(hist) < len(perc_bins) + 3:
-            hist = hist + [0 for x in range(len(perc_bins) + 3 - len(hist))]
-        lines.append('F%d %0.5f %s\n' %
-                     (i+1, nmoving / npixels * 100, ' '.join([str(x) for x in hist])))
-        print(lines[-1][0:-1])
+        if motion_frames > 0:
+            motion_pixels /= motion_frames
 
-    if motion_frames > 0:
-        motion_pixels /= motion_frames
-
-    with open(args.out_file, 'w') as f:
-        f.write('SHAPE: %d %d\n' % (width, height))
-        f.write('FRAMES: %d %d %f\n' % (nflows, motion_frames, motion_pixels))
-        f.write('BINS: %s\n' % ' '.join([str(x) for x in bins]))
-        f.writelines(lines)
+        with open(args.out_file, 'w') as f:
+            f.write('SHAPE: %d %d\n' % (width, height))
+            f.write('FRAMES: %d %d %f\n' % (nflows, motion_frames, motion_pixels))
+            f.write('BINS: %s\n' % ' '.join(map(str, bins)))
+            frame_lines.seek(0)
+            shutil.copyfileobj(frame_lines, f)
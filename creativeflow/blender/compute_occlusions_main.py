@@ -17,11 +17,25 @@ in unpack_exr_main.py.
 """
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
 from skimage.io import imsave
 
 import flow_util
 import io_util
 
+
+def process_frame(flow_file, backflow_file, occ_fname, threshold, compress_level):
+    """
+    Computes occlusions for one frame; frames are independent and are
+    processed in parallel.
+    """
+    flow = io_util.read_flow_mmap(flow_file)
+    backflow = io_util.read_flow_mmap(backflow_file)
+    occ = flow_util.get_occlusions_vec(flow, backflow,
+                                       pixel_threshold=threshold)
+    imsave(occ_fname, occ, compress_level=compress_level)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description='Computes occlusions by finding forward-back flow discrepancies '
@@ -38,6 +52,12 @@ if __name__ == "__main__":
         '--frames', action='store', type=str, default='',
         help='CSV string of frame numbers to process; otherwise process all; e.g. '
         '--frames="1,5,7".')
+    parser.add_argument(
+        '--nworkers', action='store', type=int, default=os.cpu_count(),
+        help='Number of processes to use for computing occlusions.')
+    parser.add_argument(
+        '--compress_level', action='store', type=int, default=1,
+        help='PNG compression level (0-9) for occlusion images.')
     args = parser.parse_args()
 
     data = {}
@@ -54,10 +74,12 @@ if __name__ == "__main__":
         print('Processing frames %s' % str(legit_frames))
     legit_frames.sort()
 
-    for f in legit_frames:
-        flow = io_util.read_flow(data[f]['flow'])
-        backflow = io_util.read_flow(data[f+1]['backflow'])
-        occ_fname = os.path.join(args.odir, 'occlusions%06d.png' % f)
-        occ = flow_util.get_occlusions_vec(flow, backflow,
-                                           pixel_threshold=args.threshold)
-        imsave(occ_fname, occ)
+    with ProcessPoolExecutor(max_workers=args.nworkers) as executor:
+        # Consume results to surface any exceptions from the workers
+        list(executor.map(process_frame,
+                          [data[f]['flow'] for f in legit_frames],
+                          [data[f+1]['backflow'] for f in legit_frames],
+                          [os.path.join(args.odir, 'occlusions%06d.png' % f) for f in legit_frames],
+                          [args.threshold] * len(legit_frames),
+                          [args.compress_level] * len(legit_frames),
+                          chunksize=4))
@@ -3,10 +3,15 @@ This module is not used for the dataset creation. Code here is written specifica
 is packaged and distributed to make tasks like selecting and reading training data easier.
 """
 import bisect
+import concurrent.futures
+import csv
+import functools
+import itertools
 import logging
+import numpy as np
 import os
-import pandas
 import re
+import sys
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -64,7 +69,7 @@ class DatasetHelper(object):
        flow = io_util.read_flow_file(flow_path)
     """
 
-    __OK_TAGS = {'YES', 'OK'}
+    __OK_TAGS = frozenset(['YES', 'OK'])
 
     def __init__(self, sequences_file,
                  require_flow=True,
@@ -84,7 +89,11 @@ class DatasetHelper(object):
         :param exclude_frame_numbers: list of zero-based frame numbers to exclude from every sequence
         """
         self.global_frame_numbers = []
+        self._total_frames = 0  # last of global_frame_numbers, if any
+        # Set if all sequences have the same number of frames in all styles, else None
+        self.frames_per_sequence = None
         self.sequences = []
+        self._flat_index = None  # see _get_flat_index
         self.scene_names = set()
 
         if require_flow:
@@ -93,12 +102,31 @@ class DatasetHelper(object):
             elif -1 not in exclude_frame_numbers:
                 exclude_frame_numbers.append(-1)
 
-        data_frame = pandas.read_csv(sequences_file, sep='|')
-        data_frame.fillna('', inplace=True)
-        for i in data_frame.index:
-            row = data_frame.iloc[i]
+        # Patterns are matched for every row and style, so compile them once
+        sources_re = re.compile(regex_sources)
+        shading_style_matches = DatasetHelper.__style_matcher(regex_shading_styles)
+        line_style_matches = DatasetHelper.__style_matcher(regex_line_styles)
+        tags_re = re.compile(regex_tags) if regex_tags else None
+
+        # Rows are streamed and filtered one at a time, so rejected rows are never kept; criteria
+        # on raw row values are checked before building a SequenceInfo with its frame list
+        for i, row in enumerate(DatasetHelper.read_rows(sequences_file)):
+            if require_flow and row['has_flow'] not in DatasetHelper.__OK_TAGS:
+                logger.debug('Skipping sequence (no flow): %s' % DatasetHelper.__row_str(row))
+                continue
+
+            if not sources_re.match(row['scene_source']):
+                logger.debug('Skipping sequence (source did not match regexp %s): %s' %
+                             (regex_sources, DatasetHelper.__row_str(row)))
+                continue
+
+            if tags_re and not tags_re.match(row.get('tags', '')):
+                logger.debug('Skipping sequence (tags did not match regexp %s): %s' %
+                             (regex_tags, DatasetHelper.__row_str(row)))
+                continue
+
             seq = DatasetHelper.sequence_from_row(
-                row, i, regex_shading_styles, regex_line_styles, exclude_frame_numbers)
+                row, i, shading_style_matches, line_style_matches, exclude_frame_numbers)
             if len(seq.shading_styles) == 0:
                 logger.debug(
                     'Skipping sequence (one of the shading,outline styles matched regexp %s %s): %s' %
@@ -110,38 +138,81 @@ class DatasetHelper(object):
                     'Skipping sequence (no frames included, given criteria): %s' % str(seq))
                 continue
 
-            if require_flow and not seq.has_flow:
-                logger.debug('Skipping sequence (no flow): %s' % str(seq))
-                continue
+            self._add_sequence(seq)
 
-            if not re.match(regex_sources, seq.source):
-                logger.debug('Skipping sequence (source did not match regexp %s): %s' % (regex_sources, str(seq)))
-                continue
+    @staticmethod
+    def read_rows(sequences_file):
+        """
+        Reads sequences file with a header line, yielding a dict from column name to string value
+        for every non-empty line; missing values are empty strings.
+        """
+        with open(sequences_file, 'r', newline='') as f:
+            reader = csv.reader(f, delimiter='|')
+            header = next(reader, [])
+            for values in reader:
+                if len(values) == 0:
+                    continue
+                if len(values) < len(header):
+                    values = values + [''] * (len(header) - len(values))
+                yield dict(zip(header, values))
 
-            if regex_tags and not re.match(regex_tags, seq.tags):
-                logger.debug('Skipping sequence (tags did not match regexp %s): %s' % (regex_tags, str(seq)))
-                continue
+    @staticmethod
+    def __row_str(row):
+        """ Same as str() of SequenceInfo created from row. """
+        return '%s,cam%s' % (row['scene_name'], row['cam_idx'])
 
-            self._add_sequence(seq)
+    @staticmethod
+    def __style_matcher(pattern):
+        """
+        Returns a function testing if a style name matches pattern. There are only a few
+        distinct style names across all rows, so match results are remembered.
+        """
+        if callable(pattern):
+            return pattern
+        if pattern == '.*':  # default, matches any style
+            return lambda style: True
+
+        pattern = re.compile(pattern)
+        matched = {}
+
+        def _matches(style):
+            res = matched.get(style)
+            if res is None:
+                res = pattern.match(style) is not None
+                matched[style] = res
+            return res
+        return _matches
 
     @staticmethod
     def sequence_from_row(row, row_idx, regex_shading_styles, regex_line_styles, exclude_frame_numbers):
-        shading_styles = row['shading_styles'].split(',')
-        line_styles = row['line_styles'].split(',')
+        """
+        Creates SequenceInfo from a row of the sequences file (see read_rows), keeping only
+        styles matching the regular expressions, which can be strings, compiled patterns
+        or functions from style name to bool.
+        """
+        shading_style_matches = DatasetHelper.__style_matcher(regex_shading_styles)
+        line_style_matches = DatasetHelper.__style_matcher(regex_line_styles)
+        # Names repeat across many sequences, so share one string object for each
+        shading_styles = [sys.intern(x) for x in row['shading_styles'].split(',')]
+        line_styles = [sys.intern(x) for x in row['line_styles'].split(',')]
 
         nstyles = int(row['nstyles'])
         if nstyles != len(shading_styles) or nstyles != len(line_styles):
             raise RuntimeError('Error parsing line %d: inconsistent style counts\n"%s"' % (row_idx, str(row)))
 
-        matching_indices = [i for i in range(nstyles) if
-                            (re.match(regex_shading_styles, shading_styles[i]) is not None and
-                             re.match(regex_line_styles, line_styles[i]) is not None)]
-        shading_styles_matching = [shading_styles[i] for i in matching_indices]
-        line_styles_matching = [line_styles[i] for i in matching_indices]
+        shading_styles_matching = []
+        line_styles_matching = []
+        for shading_style, line_style in zip(shading_styles, line_styles):
+            if not shading_style_matches(shading_style):
+                continue
+            if not line_style_matches(line_style):
+                continue
+            shading_styles_matching.append(shading_style)
+            line_styles_matching.append(line_style)
 
         tags = ''
         if 'tags' in row:
-            tags = row['tags']
+            tags = sys.intern(row['tags'])
 
         included_frames = None
         if 'included_frames' in row:
@@ -151,46 +222,79 @@ class DatasetHelper(object):
                 included_frames = [int(x) for x in row['included_frames'].split(',')]
 
         return SequenceInfo(
-            row['scene_name'],
-            source=row['scene_source'],
+            sys.intern(row['scene_name']),
+            source=sys.intern(row['scene_source']),
             nframes_raw=int(row['nframes']),
             cam_idx=int(row['cam_idx']),
-            shading_styles=shading_styles_matching,
-            line_styles=line_styles_matching,
+            shading_styles=tuple(shading_styles_matching),
+            line_styles=tuple(line_styles_matching),
             has_flow=(row['has_flow'] in DatasetHelper.__OK_TAGS),
             tags=tags,
             included_frames=included_frames,
             excluded_frames=exclude_frame_numbers)
 
     def _add_sequence(self, seq):
-        prev_frames = self.num_frames_in_all_styles()
-        self.global_frame_numbers.append(
-            prev_frames + seq.nframes_in_all_styles())
+        seq_frames = seq.nframes_in_all_styles()
+        if len(self.sequences) == 0:
+            self.frames_per_sequence = seq_frames
+        elif self.frames_per_sequence != seq_frames:
+            self.frames_per_sequence = None
+
+        self._total_frames += seq_frames
+        self.global_frame_numbers.append(self._total_frames)
         self.sequences.append(seq)
         self.scene_names.add(seq.scene_name)
 
-    def check_files(self, base_dir, data_types, fast_fail=False):
+    @staticmethod
+    def __file_names_getter(data_type, base_dir):
+        """
+        Returns a function from a sequence to the file names it should have for data_type,
+        deciding once which kind of data type it is rather than for every sequence.
+        """
+        if data_type in PathsHelper.META_INFO:
+            return lambda seq: [seq.get_meta_path(data_type, base_dir=base_dir)]
+        elif data_type in PathsHelper.META_FRAMES:
+            return lambda seq: [seq.get_meta_path(data_type, frame_idx, base_dir=base_dir)
+                                for frame_idx in seq.frames]
+        elif data_type in PathsHelper.RENDER_INFO:
+            return lambda seq: [seq.get_render_path(data_type, style_idx, base_dir=base_dir)
+                                for style_idx in range(seq.nstyles())]
+        elif data_type in PathsHelper.RENDER_FRAMES:
+            return lambda seq: [seq.get_render_path(data_type, style_idx, frame_idx, base_dir=base_dir)
+                                for style_idx in range(seq.nstyles())
+                                for frame_idx in seq.frames]
+        return lambda seq: []
+
+    def check_files(self, base_dir, data_types, fast_fail=False, nthreads=16):
+        def _list_dir(dirname):
+            # Same as os.path.join(dirname, name), which built the expected file names
+            prefix = os.path.join(dirname, '')
+            try:
+                return [prefix + name for name in os.listdir(dirname)]
+            except OSError:
+                return []
+
+        # Each directory is listed once, in parallel threads, instead of a stat per file
+        file_names_getters = [(data_type, DatasetHelper.__file_names_getter(data_type, base_dir))
+                              for data_type in data_types]
+        expected_files = [[(data_type, get_file_names(seq)) for data_type, get_file_names in file_names_getters]
+                          for seq in self.sequences]
+        dirnames = sorted(set(os.path.dirname(f)
+                              for seq_files in expected_files
+                              for _, file_names in seq_files
+                              for f in file_names))
+        existing_files = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=nthreads) as executor:
+            for dir_files in executor.map(_list_dir, dirnames):
+                existing_files.update(dir_files)
+
         sequences_missing_files = 0
-        for sidx in range(self.num_sequences()):
-            seq = self.sequences[sidx]
+        for seq, seq_files in zip(self.sequences, expected_files):
             seq_ok = True
-            for data_type in data_types:
-                file_names = []
-                if data_type in PathsHelper.META_INFO:
-                    file_names.append(seq.get_meta_path(data_type, base_dir=base_dir))
-                elif data_type in PathsHelper.META_FRAMES:
-                    for frame_idx in seq.frames:
-                        file_names.append(seq.get_meta_path(data_type, frame_idx, base_dir=base_dir))
-                elif data_type in PathsHelper.RENDER_INFO:
-                    for style_idx in range(seq.nstyles()):
-                        file_names.append(seq.get_render_path(data_type, style_idx, base_dir=base_dir))
-                elif data_type in PathsHelper.RENDER_FRAMES:
-                    for style_idx in range(seq.nstyles()):
-                        for frame_idx in seq.frames:
-                            file_names.append(seq.get_render_path(data_type, style_idx, frame_idx, base_dir=base_dir))
+            for data_type, file_names in seq_files:
                 missing_files = []
                 for f in file_names:
-                    if not os.path.exists(f):
+                    if f not in existing_files:
                         if fast_fail:
                             raise RuntimeError('FAIL FAST -- Missing file: %s' % f)
                         missing_files.append(f)
@@ -212,9 +316,7 @@ class DatasetHelper(object):
             return True
 
     def num_frames_in_all_styles(self):
-        if len(self.global_frame_numbers) == 0:
-            return 0
-        return self.global_frame_numbers[-1]
+        return self._total_frames
 
     def get_sequence_info(self, global_frame):
         """
@@ -227,14 +329,64 @@ class DatasetHelper(object):
         if global_frame >= self.num_frames_in_all_styles():
             raise RuntimeError('Global frame requested %d is greater than number of frames %d' %
                                (global_frame, self.num_frames_in_all_styles()))
-        i = bisect.bisect_left(self.global_frame_numbers, global_frame + 1)
-        frame_start = 0
-        if i > 0:
-            frame_start = self.global_frame_numbers[i - 1]
+        if self.frames_per_sequence and global_frame >= 0:
+            # Common case of equal length sequences needs no search
+            i = global_frame // self.frames_per_sequence
+            frame_start = i * self.frames_per_sequence
+        elif global_frame >= 0:
+            seq_idx, style_idx, frame_idx = self._get_flat_index()
+            return (self.sequences[seq_idx.item(global_frame)],
+                    style_idx.item(global_frame), frame_idx.item(global_frame))
+        else:
+            i = bisect.bisect_left(self.global_frame_numbers, global_frame + 1)
+            frame_start = 0
+            if i > 0:
+                frame_start = self.global_frame_numbers[i - 1]
         seq = self.sequences[i]
         style_idx, frame_idx = seq.get_style_frame_indices(global_frame - frame_start)
         return seq, style_idx, frame_idx
 
+    def _get_flat_index(self):
+        """
+        Returns arrays with sequence index (into self.sequences), style index and frame index of
+        every global frame, so that looking up a frame during training needs no search or
+        arithmetic. Built on first use, and rebuilt if sequences were added.
+        """
+        if self._flat_index is None or len(self._flat_index[0]) != self._total_frames:
+            nseqs = len(self.sequences)
+            nframes = np.fromiter((seq.nframes for seq in self.sequences), dtype=np.int64, count=nseqs)
+            seq_frames = np.fromiter((seq.nframes_in_all_styles() for seq in self.sequences),
+                                     dtype=np.int64, count=nseqs)
+            frames = np.fromiter(itertools.chain.from_iterable(seq.frames for seq in self.sequences),
+                                 dtype=np.int64, count=int(np.sum(nframes)))
+            frame_offsets = np.cumsum(nframes) - nframes
+
+            seq_idx = np.repeat(np.arange(nseqs, dtype=np.int32), seq_frames)
+            local_frames = np.arange(self._total_frames, dtype=np.int64) - np.repeat(
+                np.cumsum(seq_frames) - seq_frames, seq_frames)
+            seq_nframes = nframes[seq_idx]
+            style_idx = local_frames // seq_nframes
+            frame_idx = frames[frame_offsets[seq_idx] + local_frames - style_idx * seq_nframes]
+            self._flat_index = (seq_idx, style_idx.astype(np.int16), frame_idx.astype(np.int32))
+        return self._flat_index
+
+    def get_sequence_info_batch(self, global_frames):
+        """
+        Same as get_sequence_info, but looks up many global frames at once.
+
+        :param global_frames: integer array of global frame numbers
+        :return: integer arrays of sequence indices (into self.sequences), style indices and
+                 frame indices, each with the same shape as global_frames
+        """
+        global_frames = np.asarray(global_frames, dtype=np.int64)
+        if global_frames.size > 0 and (global_frames.min() < 0 or
+                                       global_frames.max() >= self.num_frames_in_all_styles()):
+            raise RuntimeError('Global frames requested must be in [0, %d), but got range [%d, %d]' %
+                               (self.num_frames_in_all_styles(), global_frames.min(), global_frames.max()))
+
+        seq_idx, style_idx, frame_idx = self._get_flat_index()
+        return seq_idx[global_frames], style_idx[global_frames], frame_idx[global_frames]
+
     def num_scenes(self):
         """
         Scene is a 3D action scene that can be shot from multiple angles.
@@ -280,7 +432,13 @@ class PathsHelper(object):
         DataType.RENDER_COMPOSITE_LICENSE: ('composite', 'style.%s', 'LICENSE.txt')
         }
 
+    # Training loops request the same frame paths every epoch, so these are cached, as
+    # are sequence directories shared by all frames of a sequence; callers pass
+    # positional arguments, which make for a cheaper cache lookup
+    PATH_CACHE_SIZE = 1 << 16
+
     @staticmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
     def sequence_dir(base_dir, sequence_name, cam_idx):
         return os.path.join(base_dir, sequence_name, 'cam%d' % cam_idx)
 
@@ -292,13 +450,21 @@ class PathsHelper(object):
                 (str(data_type), ','.join([str(x) for x in data_types_dict.keys()])))
 
     @staticmethod
-    def meta_frame_path(data_type, base_dir, sequence_name, cam_idx, frame_idx):
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def __meta_frame_format(data_type, base_dir, sequence_name, cam_idx):
+        """ Returns format string for paths of all frames of a sequence, given one-based frame number. """
         PathsHelper.__check_datatype_in(data_type, PathsHelper.META_FRAMES)
         seq_dir = PathsHelper.sequence_dir(base_dir=base_dir,
                                            sequence_name=sequence_name,
                                            cam_idx=cam_idx)
         names = PathsHelper.META_FRAMES[data_type]
-        return os.path.join(seq_dir, 'metadata', names[0], names[1] % (frame_idx + 1))
+        frame_dir = os.path.join(seq_dir, 'metadata', names[0]).replace('%', '%%')
+        return os.path.join(frame_dir, names[1])
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def meta_frame_path(data_type, base_dir, sequence_name, cam_idx, frame_idx):
+        return PathsHelper.__meta_frame_format(data_type, base_dir, sequence_name, cam_idx) % (frame_idx + 1)
 
     @staticmethod
     def meta_info_path(data_type, base_dir, sequence_name, cam_idx):
@@ -310,7 +476,9 @@ class PathsHelper(object):
         return os.path.join(seq_dir, 'metadata', names[0], names[1])
 
     @staticmethod
-    def render_frame_path(data_type, base_dir, sequence_name, cam_idx, frame_idx, style_idx, style_name):
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def __render_frame_format(data_type, base_dir, sequence_name, cam_idx, style_idx, style_name):
+        """ Returns format string for paths of all frames of a sequence style, given one-based frame number. """
         PathsHelper.__check_datatype_in(data_type, PathsHelper.RENDER_FRAMES)
         seq_dir = PathsHelper.sequence_dir(base_dir=base_dir,
                                            sequence_name=sequence_name,
@@ -321,7 +489,14 @@ class PathsHelper(object):
             style_dir = names[1] % style_name
         else:
             style_dir = names[1] % (style_idx, style_name)
-        return os.path.join(seq_dir, 'renders', names[0], style_dir, names[2] % (frame_idx + 1))
+        frame_dir = os.path.join(seq_dir, 'renders', names[0], style_dir).replace('%', '%%')
+        return os.path.join(frame_dir, names[2])
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def render_frame_path(data_type, base_dir, sequence_name, cam_idx, frame_idx, style_idx, style_name):
+        return PathsHelper.__render_frame_format(
+            data_type, base_dir, sequence_name, cam_idx, style_idx, style_name) % (frame_idx + 1)
 
     @staticmethod
     def render_info_path(data_type, base_dir, sequence_name, cam_idx, style_idx, style_name):
@@ -461,6 +636,16 @@ class LineStyles(object):
 
 
 class SequenceInfo(object):
+    # Datasets hold many sequences; slots avoid a per-instance attribute dict
+    __slots__ = ('scene_name', 'source', 'nframes_raw', 'cam_idx', 'shading_styles', 'line_styles',
+                 'composite_styles', 'has_flow', 'tags', 'frames', 'nframes', '_nframes_all_styles')
+    # Attribute holding style names for each render data type, composite styles for others
+    __STYLE_NAMES = {
+        DataType.RENDER_SHADING: 'shading_styles',
+        DataType.RENDER_LINE: 'line_styles',
+        DataType.RENDER_LINE_ALPHA: 'line_styles'
+    }
+
     def __init__(self, scene_name, source, nframes_raw, cam_idx, shading_styles, line_styles, has_flow, tags='',
                  included_frames=None, excluded_frames=None):
         """
@@ -486,27 +671,38 @@ class SequenceInfo(object):
         self.cam_idx = cam_idx
         self.shading_styles = shading_styles
         self.line_styles = line_styles
+        # Composite render style names, e.g. "paint1.pen5"
+        self.composite_styles = tuple('%s.%s' % x for x in zip(shading_styles, line_styles))
         self.has_flow = has_flow
         self.tags = tags
 
         orig_frames = range(0, nframes_raw)
         if included_frames is not None:
             self.frames = included_frames
+            if excluded_frames:
+                indexes = set([orig_frames[i] for i in excluded_frames])
+                self.frames = [x for x in self.frames if x not in indexes]
+            if type(self.frames) != range:
+                self.frames = sorted(self.frames)
+        elif nframes_raw > 0 and excluded_frames and all(i == -1 for i in excluded_frames):
+            # Common case of only excluding the last frame, which has no flow
+            self.frames = range(0, nframes_raw - 1)
+        elif excluded_frames:
+            # Masking excluded indices leaves remaining frames in order, unlike filtering a set
+            included = np.ones(nframes_raw, dtype=np.bool_)
+            included[excluded_frames] = False
+            self.frames = np.flatnonzero(included).tolist()
         else:
             self.frames = orig_frames
-        if excluded_frames:
-            indexes = set([orig_frames[i] for i in excluded_frames])
-            self.frames = filter(lambda x: x not in indexes, self.frames)
-        if type(self.frames) != range:
-            self.frames = list(self.frames)
-            self.frames.sort()
         self.nframes = len(self.frames)
+        # Frames and styles are fixed once filtered, so the total is computed once
+        self._nframes_all_styles = self.nframes * len(self.shading_styles)
 
     def nstyles(self):
         return len(self.shading_styles)
 
     def nframes_in_all_styles(self):
-        return self.nframes * len(self.shading_styles)
+        return self._nframes_all_styles
 
     def get_style_frame_indices(self, global_frame):
         """
@@ -518,39 +714,28 @@ class SequenceInfo(object):
         :param global_frame: frame number within the sequence of all frames in all styles
         :return: style index, frame index
         """
-        tot_frames = self.nframes
-        style_idx = global_frame // tot_frames
-        if style_idx >= len(self.shading_styles):
+        if global_frame >= self._nframes_all_styles:
             raise RuntimeError('Requesting out of bounds frame %d from sequence with %d styles and %d frames: %s' %
                                (global_frame, len(self.shading_styles), self.nframes, str(self)))
-        frame_idx = global_frame - tot_frames * style_idx
-        frame_idx = self.frames[frame_idx]
-        return style_idx, frame_idx
+        style_idx, frame_idx = divmod(global_frame, self.nframes)
+        return style_idx, self.frames[frame_idx]
 
     def get_meta_path(self, data_type, frame_idx=None, base_dir=''):
         if frame_idx is None or data_type in PathsHelper.META_INFO:
             return PathsHelper.meta_info_path(
                 data_type, base_dir=base_dir, sequence_name=self.scene_name, cam_idx=self.cam_idx)
         else:
-            return PathsHelper.meta_frame_path(
-                data_type, base_dir=base_dir, sequence_name=self.scene_name, cam_idx=self.cam_idx,
-                frame_idx=frame_idx)
+            return PathsHelper.meta_frame_path(data_type, base_dir, self.scene_name, self.cam_idx, frame_idx)
 
     def get_render_path(self, data_type, style_idx, frame_idx=None, base_dir=''):
-        if data_type == DataType.RENDER_SHADING:
-            style_name = self.shading_styles[style_idx]
-        elif data_type == DataType.RENDER_LINE or data_type == DataType.RENDER_LINE_ALPHA:
-            style_name = self.line_styles[style_idx]
-        else:
-            style_name = '%s.%s' % (self.shading_styles[style_idx], self.line_styles[style_idx])
+        style_name = getattr(self, SequenceInfo.__STYLE_NAMES.get(data_type, 'composite_styles'))[style_idx]
         if frame_idx is None or data_type in PathsHelper.RENDER_INFO:
             return PathsHelper.render_info_path(
                 data_type, base_dir=base_dir, sequence_name=self.scene_name, cam_idx=self.cam_idx,
                 style_idx=style_idx, style_name=style_name)
         else:
             return PathsHelper.render_frame_path(
-                data_type, base_dir=base_dir, sequence_name=self.scene_name, cam_idx=self.cam_idx,
-                style_idx=style_idx, style_name=style_name, frame_idx=frame_idx)
+                data_type, base_dir, self.scene_name, self.cam_idx, frame_idx, style_idx, style_name)
 
     def __str__(self):
         return '%s,cam%d' % (self.scene_name, self.cam_idx)
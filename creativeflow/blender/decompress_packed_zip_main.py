@@ -16,7 +16,9 @@ worse than if we first concatenate flows into a single numpy array and zip
 up that. This main decompresses these special zip files.
 """
 import argparse
-import os
+import collections
+import concurrent.futures
+import numpy as np
 import skimage.io
 
 import io_util
@@ -35,19 +37,32 @@ if __name__ == "__main__":
         '--output_pattern', action='store', type=str, required=True,
         help='Specify output per-frame file format, e.g. /OUTDIR/flow%06d.flo; ' +
         'note that all frames will be 1-based.')
+    parser.add_argument(
+        '--nthreads', action='store', type=int, default=4,
+        help='Number of threads writing out frames while the zip is decompressed.')
     args = parser.parse_args()
 
-    odir = os.path.dirname(args.output_pattern)
-    obasename = os.path.basename(args.output_pattern)
     if args.input_type == 'FLOW':
-        flows = io_util.decompress_flows(
-            args.input_zip, output_dir=odir, outfile_pattern=obasename)
+        dtype = np.float32
+        write_function = lambda fname, item: io_util.write_flow(item, fname)
     elif args.input_type == 'PNG':
-        images = io_util.decompress_images(
-            args.input_zip, write_function=skimage.io.imsave, output_dir=odir, outfile_pattern=obasename)
+        dtype = np.uint8
+        write_function = lambda fname, item: skimage.io.imsave(fname, item)
     elif args.input_type == 'ARRAY':
-        arrays = io_util.decompress_arrays(
-            args.input_zip, output_dir=odir, outfile_pattern=obasename)
+        dtype = np.float32
+        write_function = lambda fname, item: np.squeeze(item).tofile(fname)
     else:
         raise RuntimeError('Unrecognized --input_type=%s . Must use FLOW or ARRAY.' %
                            args.input_type)
+
+    # Frames are decompressed one at a time, while previous frames are written out in
+    # parallel threads; at most a few frames are waiting to be written at any time.
+    max_pending = 2 * args.nthreads
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.nthreads) as executor:
+        for i, item in enumerate(io_util.iter_decompressed_4dnparray(args.input_zip, dtype=dtype)):
+            if len(pending) >= max_pending:
+                pending.popleft().result()
+            pending.append(executor.submit(write_function, args.output_pattern % (i + 1), item))
+        for future in pending:
+            future.result()
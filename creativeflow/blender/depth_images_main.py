@@ -14,9 +14,31 @@ import glob
 import numpy as np
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from skimage.io import imsave
 
 
+def process_files(files, ofiles, depth_range, dshape, compress_level):
+    """
+    Normalizes depth arrays of shape dshape to the depth range in buffers reused
+    across files, and writes them as 8-bit images to the corresponding ofiles.
+    """
+    depth_denom = max(0.0001, depth_range[1] - depth_range[0])
+
+    # All frames have the same shape, so normalization is done in place
+    dbuf = np.empty(dshape[:2], dtype=np.float32)
+    dimg = np.empty(dshape[:2], dtype=np.uint8)
+    for f, ofile in zip(files, ofiles):
+        depth = np.memmap(f, dtype=np.float32, mode='r', shape=tuple(dshape))
+        np.subtract(depth[:,:,0], depth_range[0], out=dbuf)
+        np.divide(dbuf, depth_denom, out=dbuf)
+        np.subtract(1.0, dbuf, out=dbuf)
+        np.multiply(dbuf, 255, out=dbuf)
+        np.clip(dbuf, 0, 255, out=dbuf)
+        np.copyto(dimg, dbuf, casting='unsafe')
+        imsave(ofile, dimg, compress_level=compress_level)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description='Converts a directory of depth arrays and a depth range ' +
@@ -30,6 +52,12 @@ if __name__ == "__main__":
     parser.add_argument(
         '--depth_img_odir', action='store', type=str, required=True,
         help='Output directory for depth image files, will output png.')
+    parser.add_argument(
+        '--compress_level', action='store', type=int, default=6,
+        help='PNG compression level (0-9) for depth images.')
+    parser.add_argument(
+        '--nworkers', action='store', type=int, default=os.cpu_count() or 1,
+        help='Number of processes to use for writing depth images.')
     args = parser.parse_args()
 
     fpattern = os.path.join(args.depth_array_dir, '*')
@@ -50,18 +78,25 @@ if __name__ == "__main__":
         print('Parsed depth range, shape')
         print(depth_range)
         print(dshape)
-    depth_denom = max(0.0001, depth_range[1] - depth_range[0])
+
+    fnumber_re = re.compile('[a-z]+([0-9]+).[a-z]+')
 
     def _make_ofile(infile):
         bname = os.path.basename(infile)
-        r = re.match('[a-z]+([0-9]+).[a-z]+', bname)
+        r = fnumber_re.match(bname)
         if r is None:
             bname = infile + '.png'
         else:
             bname = 'depth%s.png' % r.group(1)
         return os.path.join(args.depth_img_odir, bname)
 
-    for f in files:
-        depth = np.fromfile(f, dtype=np.float32).reshape(dshape)
-        dimg = ((1.0 - (depth[:,:,0] - depth_range[0]) / depth_denom) * 255).clip(0, 255).astype(np.uint8)
-        imsave(_make_ofile(f), dimg)
+    # Files are split into a few chunks per worker, so that buffers are reused within a chunk
+    chunk_size = max(1, -(-len(files) // (args.nworkers * 4)))
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    with ProcessPoolExecutor(max_workers=args.nworkers) as executor:
+        list(executor.map(process_files,
+                          chunks,
+                          [[_make_ofile(f) for f in chunk] for chunk in chunks],
+                          [depth_range] * len(chunks),
+                          [dshape] * len(chunks),
+                          [args.compress_level] * len(chunks)))
@@ -9,67 +9,72 @@ import numpy as np
 
 def read_exr_metadata(exr_file):
     exr = OpenEXR.InputFile(exr_file)
+    # Header is built anew by every header() call, so it is read once for all channels
+    header = exr.header()
 
-    return {'flow': read_flow(exr),
-            'back_flow': read_back_flow(exr),
-            'depth': read_depth(exr)}
+    return {'flow': read_flow(exr, header),
+            'back_flow': read_back_flow(exr, header),
+            'depth': read_depth(exr, header)}
 
 
-def read_flow(exr):
+def read_flow(exr, header=None):
     # It is perplexing, but this appears to be correct based on carefully examined examples.
     # xflow: -Z, yflow: W
-    res = channels_to_array(exr, ['Vector.Z', 'Vector.W'])
-    res[:, :, 0] = -res[:, :, 0]
+    res = channels_to_array(exr, ['Vector.Z', 'Vector.W'], header=header)
+    np.negative(res[:, :, 0], out=res[:, :, 0])
     return res
 
 
-def read_back_flow(exr):
+def read_back_flow(exr, header=None):
     # This appears to be correct based on carefully examined examples.
     # x backflow: X, ybackflow: -Y
-    res = channels_to_array(exr, ['Vector.X', 'Vector.Y'])
-    res[:, :, 1] = -res[:,:,1]
+    res = channels_to_array(exr, ['Vector.X', 'Vector.Y'], header=header)
+    np.negative(res[:, :, 1], out=res[:, :, 1])
     return res
 
 
-def read_depth(exr):
-    return channels_to_array(exr, ['Depth.Z', 'Combined.A'], pick_any=True)
+def read_depth(exr, header=None):
+    return channels_to_array(exr, ['Depth.Z', 'Combined.A'], pick_any=True, header=header)
 
 
-def get_size(exr):
-    dw = exr.header()['dataWindow']
+def get_size(exr, header=None):
+    if header is None:
+        header = exr.header()
+    dw = header['dataWindow']
     size = (dw.max.x - dw.min.x + 1, dw.max.y - dw.min.y + 1)
     return size
 
 
-def channels_to_array(exr, channel_patterns, pick_any=False):
-    size = get_size(exr)
+def channels_to_array(exr, channel_patterns, pick_any=False, header=None):
+    if header is None:
+        header = exr.header()
+    width, height = get_size(exr, header)
+    # Channel data is stored row by row, so this is a view of the bytes for any frame shape
+    shape = (height, width)
+    channels = header['channels']
+    names = [__match_channel(channels, cp, pick_any=pick_any) for cp in channel_patterns]
 
-    if len(channel_patterns) == 1:
-        return __parse_channel(exr, channel_patterns[0], size, pick_any=pick_any)
+    if len(names) == 1:
+        return np.frombuffer(exr.channel(names[0]), dtype=np.float32).reshape(shape)
 
-    arrays = []
-    for cp in channel_patterns:
-        arrays.append(
-            np.expand_dims(
-                __parse_channel(exr, cp, size, pick_any=pick_any), axis=2))
+    # Read all channels in one call
+    res = np.empty(shape + (len(names),), dtype=np.float32)
+    for i, Vstr in enumerate(exr.channels(names)):
+        res[:, :, i] = np.frombuffer(Vstr, dtype=np.float32).reshape(shape)
+    return res
 
-    return np.concatenate(arrays, axis=2)
 
+def __match_channel(channels, channel_pattern, pick_any=False):
+    likely_match = 'RenderLayer.%s' % channel_pattern
+    if not pick_any and likely_match in channels:
+        # Preferred among all matches anyway, so no need to scan all channel names
+        return likely_match
 
-def __parse_channel(exr, channel_pattern, size, pick_any=False):
-    channels = [k for k in exr.header()['channels'].keys() if channel_pattern in k]
-    if len(channels) > 1 and not pick_any:
-        likely_match = 'RenderLayer.%s' % channel_pattern
-        if likely_match in channels:
-            channels = [ likely_match ]
-        else:
-            raise RuntimeError('More than one channel matched %s: %s' %
-                               (channel_pattern, ', '.join(channels)))
-    if len(channels) == 0:
+    matching = [k for k in channels if channel_pattern in k]
+    if len(matching) > 1 and not pick_any:
+        raise RuntimeError('More than one channel matched %s: %s' %
+                           (channel_pattern, ', '.join(matching)))
+    if len(matching) == 0:
         raise RuntimeError('No channel matched %s out of: %s' %
-                           (channel_pattern, ', '.join(exr.header()['channels'].keys())))
-
-    Vstr = exr.channel(channels[0])
-    V = np.frombuffer(Vstr, dtype = np.float32)
-    Vr = V.reshape(size)
-    return Vr
+                           (channel_pattern, ', '.join(channels)))
+    return matching[0]
@@ -13,9 +13,9 @@ Note on flow representation:
     F[r][c][1] - translation of pixel (x=c, y=r) from this to next frame in pixels
                  along y direction (important! pixels moving UP have NEGATIVE flow)
 """
+import functools
 import numpy as np
 import math
-from skimage.transform import resize
 
 
 def get_val_interpolated(flow, r_float, c_float):
@@ -47,6 +47,31 @@ def get_val_interpolated(flow, r_float, c_float):
     return val_prev * r_alpha + val_next * (1 - r_alpha)
 
 
+def __get_val_interpolated_scalar(flow, r_float, c_float):
+    """
+    Same as get_val_interpolated for an in-bounds position, but returns a list
+    of channel values computed on Python floats.
+    """
+    r_float = float(r_float)
+    c_float = float(c_float)
+    r_prev = int(math.floor(r_float))
+    r_next = int(math.ceil(r_float))
+    r_alpha = r_next - r_float
+    r_next = min(r_next, flow.shape[0] - 1)
+    c_prev = int(math.floor(c_float))
+    c_next = int(math.ceil(c_float))
+    c_alpha = c_next - c_float
+    c_next = min(c_next, flow.shape[1] - 1)
+
+    r_beta = 1 - r_alpha
+    c_beta = 1 - c_alpha
+    return [(v00 * c_alpha + v01 * c_beta) * r_alpha + (v10 * c_alpha + v11 * c_beta) * r_beta
+            for v00, v01, v10, v11 in zip(flow[r_prev, c_prev].tolist(),
+                                       flow[r_prev, c_next].tolist(),
+                                       flow[r_next, c_prev].tolist(),
+                                       flow[r_next, c_next].tolist())]
+
+
 def get_val_interpolated_vec(flow, r_float, c_float, fill_val=0.0):
     """
     @param flow: N x M x 2 flow array, with channel 0 - x movement, channel 1 - y movement
@@ -54,7 +79,8 @@ def get_val_interpolated_vec(flow, r_float, c_float, fill_val=0.0):
     @param c_float: column values in the same shape as r_float
     @param fill_val: what to put for invalid row,col values
     @return 2-channel array with the same first one or two dimensions as r_float,
-            holding interpolated flow values
+            holding interpolated flow values, and a boolean array in the shape of
+            r_float, marking invalid row,col values
     """
     rows = flow.shape[0]
     cols = flow.shape[1]
@@ -63,55 +89,106 @@ def get_val_interpolated_vec(flow, r_float, c_float, fill_val=0.0):
     c_float = np.asarray(c_float)
 
     out_shape = [x for x in r_float.shape]
-    invalid = np.zeros(out_shape, dtype=np.int32)
-
     if len(flow.shape) > 2:
         out_shape.append(flow.shape[2])  # add channels
 
-    invalid[r_float > rows - 1] = 1
-    invalid[r_float < 0] = 1
-    invalid[c_float > cols - 1] = 1
-    invalid[c_float < 0] = 1
+    invalid = (r_float > rows - 1) | (r_float < 0) | (c_float > cols - 1) | (c_float < 0)
 
     r = r_float.reshape([-1])
     c = c_float.reshape([-1])
 
-    r_prev = np.clip(np.floor(r).astype(int), 0, rows - 1)
-    r_next = np.clip(np.ceil(r).astype(int), 0, rows - 1)
-    c_prev = np.clip(np.floor(c).astype(int), 0, cols - 1)
-    c_next = np.clip(np.ceil(c).astype(int), 0, cols - 1)
-
-    r_alpha = np.expand_dims(r_next - r, axis=1)
-    c_alpha = np.expand_dims(c_next - c, axis=1)
-
-    val_prev = flow[r_prev, c_prev, :] * c_alpha + flow[r_prev, c_next, :] * (1 - c_alpha)
-    val_next = flow[r_next, c_prev, :] * c_alpha + flow[r_next, c_next, :] * (1 - c_alpha)
-
-    val = val_prev * r_alpha + val_next * (1 - r_alpha)
+    # The next neighbor is always prev + 1, as its weight is 0 for integer positions;
+    # weights are float32 to avoid upcasting the sampled values to float64
+    r_prev = np.floor(r).astype(np.int32)
+    c_prev = np.floor(c).astype(np.int32)
+    r_alpha = np.expand_dims((r_prev + 1 - r).astype(np.float32), axis=1)
+    c_alpha = np.expand_dims((c_prev + 1 - c).astype(np.float32), axis=1)
+    r_beta = 1 - r_alpha
+    c_beta = 1 - c_alpha
+
+    np.clip(r_prev, 0, rows - 1, out=r_prev)
+    np.clip(c_prev, 0, cols - 1, out=c_prev)
+    r_next = np.minimum(r_prev + 1, rows - 1)
+    c_next = np.minimum(c_prev + 1, cols - 1)
+
+    # Whole pixels are gathered with flat indices
+    flow_flat = flow.reshape((rows * cols, -1))
+    offset_prev = r_prev * cols
+    offset_next = r_next * cols
+    val_prev = (np.take(flow_flat, offset_prev + c_prev, axis=0) * c_alpha +
+                np.take(flow_flat, offset_prev + c_next, axis=0) * c_beta)
+    val_next = (np.take(flow_flat, offset_next + c_prev, axis=0) * c_alpha +
+                np.take(flow_flat, offset_next + c_next, axis=0) * c_beta)
+
+    val = val_prev * r_alpha + val_next * r_beta
     val = val.reshape(out_shape)
-    val[invalid > 0, :] = fill_val
+    val[invalid, :] = fill_val
 
     return val, invalid
 
 
-def get_occlusions_vec(forward_flow, back_flow, pixel_threshold=0.01):
+def split_channels(img):
+    """
+    Splits an H x W x C image into a list of C contiguous H x W arrays.
+    """
+    return [np.ascontiguousarray(img[:, :, ch]) for ch in range(img.shape[2])]
+
+
+def get_occlusions_vec(forward_flow, back_flow, pixel_threshold=0.01, out=None):
     """
     Same as get_occlusions, but 100x faster.
+    @param out optional rows x cols uint8 array to write the result into, e.g. to
+           reuse one buffer for all frames of a sequence
     """
     rows = forward_flow.shape[0]
     cols = forward_flow.shape[1]
-    res = np.zeros((rows, cols), dtype=np.uint8)
-
-    f_idx = np.indices((rows, cols))
-    b_idx = np.concatenate([np.expand_dims(f_idx[0, :, :] + forward_flow[:, :, 1], axis=2),
-                            np.expand_dims(f_idx[1, :, :] + forward_flow[:, :, 0], axis=2)],
-                           axis=2)
-
-    bf, invalid = get_val_interpolated_vec(back_flow, b_idx[:, :, 0], b_idx[:, :, 1])
-    delta = np.sqrt(np.sum(np.square(forward_flow + bf), axis=2))
-
-    res[delta > pixel_threshold] = 255
-    res[invalid > 0] = 255
+    if out is None:
+        res = np.zeros((rows, cols), dtype=np.uint8)
+    else:
+        res = out
+        res.fill(0)
+
+    b_r = np.arange(rows)[:, np.newaxis] + forward_flow[:, :, 1]  # rows in frame 1
+    b_c = np.arange(cols)[np.newaxis, :] + forward_flow[:, :, 0]  # cols in frame 1
+    invalid = (b_r > rows - 1) | (b_r < 0) | (b_c > cols - 1) | (b_c < 0)
+
+    r_prev = np.clip(np.floor(b_r).astype(int), 0, rows - 1)
+    r_next = np.clip(np.ceil(b_r).astype(int), 0, rows - 1)
+    c_prev = np.clip(np.floor(b_c).astype(int), 0, cols - 1)
+    c_next = np.clip(np.ceil(b_c).astype(int), 0, cols - 1)
+    r_alpha = r_next - b_r
+    c_alpha = c_next - b_c
+    r_beta = 1 - r_alpha
+    c_beta = 1 - c_alpha
+
+    # Flat indices of the 4 neighbors, shared by both channels
+    idx_pp = r_prev * cols + c_prev
+    idx_pn = r_prev * cols + c_next
+    idx_np = r_next * cols + c_prev
+    idx_nn = r_next * cols + c_next
+
+    # Bilinear interpolation with floor/ceil neighbors and float64 weights, as in
+    # get_occlusions, rather than the float32 weights of get_val_interpolated_vec,
+    # so that both occlusion functions give identical masks near the threshold;
+    # accumulated into the squared norm of the flow difference one channel at a time
+    delta_sq = np.zeros((rows, cols), dtype=b_r.dtype)
+    val = np.empty_like(delta_sq)
+    tmp = np.empty_like(delta_sq)
+    for ch, bf in enumerate(split_channels(back_flow)):
+        bf = bf.reshape(-1)
+        np.multiply(np.take(bf, idx_pp), c_alpha, out=val)
+        val += np.take(bf, idx_pn) * c_beta
+        val *= r_alpha
+        np.multiply(np.take(bf, idx_np), c_alpha, out=tmp)
+        tmp += np.take(bf, idx_nn) * c_beta
+        tmp *= r_beta
+        val += tmp
+        val += forward_flow[:, :, ch]
+        val *= val
+        delta_sq += val
+
+    res[delta_sq > pixel_threshold * pixel_threshold] = 255
+    res[invalid] = 255
     return res
 
 
@@ -125,28 +202,66 @@ def get_occlusions(forward_flow, back_flow, pixel_threshold=0.01):
     """
     rows = forward_flow.shape[0]
     cols = forward_flow.shape[1]
+    max_r = rows - 1
+    max_c = cols - 1
+    max_delta_sq = pixel_threshold * pixel_threshold
     res = np.zeros((rows, cols), dtype=np.uint8)
-    for r in range(rows):
-        for c in range(cols):
-            ff = forward_flow[r][c]
-            b_r = r + ff[1]  # row in frame 1
-            b_c = c + ff[0]  # col in frame 1
+    # Rows of flow are converted to Python floats for per-pixel access
+    for r, ff_row in enumerate(forward_flow):
+        for c, (ff_x, ff_y) in enumerate(ff_row.tolist()):
+            b_r = r + ff_y  # row in frame 1
+            b_c = c + ff_x  # col in frame 1
             # print('R,C (%d, %d) --> (%0.2f, %0.2f)' % (r, c, b_r, b_c))
 
             is_occluded = False
-            if b_r > rows - 1 or b_r < 0 or b_c > cols - 1 or b_c < 0:
+            if b_r > max_r or b_r < 0 or b_c > max_c or b_c < 0:
                 is_occluded = True
             else:
-                bf = get_val_interpolated(back_flow, b_r, b_c)
-                delta = np.linalg.norm(ff + bf)
-                if delta > pixel_threshold:
+                bf_x, bf_y = __get_val_interpolated_scalar(back_flow, b_r, b_c)
+                d_x = ff_x + bf_x
+                d_y = ff_y + bf_y
+                if d_x * d_x + d_y * d_y > max_delta_sq:
                     is_occluded = True
 
             if is_occluded:
-                res[r][c] = 255
+                res[r, c] = 255
     return res
 
 
+def __sanity_tolerances(ids0, ids1, corresp0, corresp1):
+    """
+    Checks images passed to cross_check_sanity and returns tolerances
+    ids_atol, corr_atol for comparing their pixels.
+    """
+    ids_atol = 1
+    corr_atol = 4
+    if ids0.dtype != np.uint8 or ids1.dtype != np.uint8:
+        ids_atol = 0.01
+        print('WARNING: Ids image dtype (%s) is not uint8; thresholds might be off' %
+              str(ids0.dtype))
+
+    if corresp0.dtype != np.uint8 or corresp1.dtype != np.uint8:
+        corr_atol = 0.016
+        print('WARNING: Correspondence image dtype (%s) is not uint8; thresholds might be off' %
+              str(corresp0.dtype))
+
+    if len(corresp0.shape) != 3 or len(corresp1.shape) != 3:
+        raise RuntimeError('Correspondences must have the color component.')
+
+    return ids_atol, corr_atol
+
+
+def __pixels_close(a, b, atol):
+    """
+    Same as np.allclose (default rtol), but for N pixels at once; returns a
+    vector of N bools, one per pixel, that is true if all its channels are close.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    close = np.abs(a - b) <= atol + 1.0e-05 * np.abs(b)
+    return close.reshape((close.shape[0], -1)).all(axis=1)
+
+
 def cross_check_sanity(flow0, ids0, ids1, corresp0, corresp1, occlusions0, row0, col0,
                        verbose=False, output_sanity_type=False):
     """
@@ -164,20 +279,7 @@ def cross_check_sanity(flow0, ids0, ids1, corresp0, corresp1, occlusions0, row0,
     3 - Ids disagree, but pixel not marked as occluded
     4 - Correspondences disagree, but pixel not marked as occluded
     """
-    ids_atol = 1
-    corr_atol = 4
-    if ids0.dtype != np.uint8 or ids1.dtype != np.uint8:
-        ids_atol = 0.01
-        print('WARNING: Ids image dtype (%s) is not uint8; thresholds might be off' %
-              str(ids0.dtype))
-
-    if corresp0.dtype != np.uint8 or corresp1.dtype != np.uint8:
-        corr_atol = 0.016
-        print('WARNING: Correspondence image dtype (%s) is not uint8; thresholds might be off' %
-              str(corresp0.dtype))
-
-    if len(corresp0.shape) != 3 or len(corresp1.shape) != 3:
-        raise RuntimeError('Correspondences must have the color component.')
+    ids_atol, corr_atol = __sanity_tolerances(ids0, ids1, corresp0, corresp1)
 
     rows = flow0.shape[0]
     cols = flow0.shape[1]
@@ -193,14 +295,14 @@ def cross_check_sanity(flow0, ids0, ids1, corresp0, corresp1, occlusions0, row0,
     if all_agree:
         idcolor0 = ids0[row0][col0]
         idcolor1 = ids1[int(round(row1))][int(round(col1))]
-        ids_agree = np.allclose(idcolor0, idcolor1, atol=ids_atol)
+        ids_agree = __pixels_close([idcolor0], [idcolor1], ids_atol)[0]
         all_agree = all_agree and ids_agree
 
         if all_agree:
             # Do correspondences agree?
             corrcolor0 = corresp0[row0][col0]
-            corrcolor1 = get_val_interpolated(corresp1, row1, col1)
-            corr_agree = np.allclose(corrcolor0, corrcolor1, atol=corr_atol)
+            corrcolor1 = __get_val_interpolated_scalar(corresp1, row1, col1)
+            corr_agree = __pixels_close([corrcolor0], [corrcolor1], corr_atol)[0]
             all_agree = all_agree and corr_agree
 
     is_sane = (all_agree and not is_occluded) or (not all_agree and is_occluded)
@@ -234,19 +336,75 @@ def cross_check_sanity(flow0, ids0, ids1, corresp0, corresp1, occlusions0, row0,
         return is_sane
 
 
-# fast re-sample layer, taken from:
-# https://github.com/liruoteng/OpticalFlowToolkit/blob/master/lib/flowlib.py
-def resample_flow(img, sz):
+def cross_check_sanity_batch(flow0, ids0, ids1, corresp0, corresp1, occlusions0, rows0, cols0,
+                             chunk_size=32768):
     """
-    img: flow map to be resampled
-    sz: new flow map size. Must be [height,weight]
+    Same as cross_check_sanity, but checks all pixels at locations rows0, cols0 at once.
+
+    @param rows0: integer vector of row indices in the first frame
+    @param cols0: integer vector of column indices, same length as rows0
+    @param chunk_size: number of pixels to check at a time
+    @return uint8 vector of sanity types (see cross_check_sanity), one per input pixel
+    """
+    ids_atol, corr_atol = __sanity_tolerances(ids0, ids1, corresp0, corresp1)
+
+    rows = flow0.shape[0]
+    cols = flow0.shape[1]
+
+    def _flat_view(img):
+        return img.reshape((rows * cols,) + img.shape[2:])
+
+    flow0_flat = _flat_view(flow0)
+    occlusions0_flat = _flat_view(occlusions0)
+    ids0_flat = _flat_view(ids0)
+    ids1_flat = _flat_view(ids1)
+    corresp0_flat = _flat_view(corresp0)
+
+    def _check_chunk(rows0, cols0):
+        idx0 = rows0 * cols + cols0
+        ff = np.take(flow0_flat, idx0, axis=0)
+        is_occluded = np.take(occlusions0_flat, idx0, axis=0) > 200
+
+        row1 = rows0 + ff[:, 1]  # row in frame 1
+        col1 = cols0 + ff[:, 0]  # col in frame 1
+
+        in_bounds = (row1 >= 0) & (col1 >= 0) & (row1 <= rows - 1) & (col1 <= cols - 1)
+
+        # Out of bounds pixels are clipped to allow gathering, but never agree
+        row1_int = np.clip(np.round(row1).astype(np.int64), 0, rows - 1)
+        col1_int = np.clip(np.round(col1).astype(np.int64), 0, cols - 1)
+        ids_agree = __pixels_close(np.take(ids0_flat, idx0, axis=0),
+                                   np.take(ids1_flat, row1_int * cols + col1_int, axis=0), ids_atol)
+
+        corrcolor1, _ = get_val_interpolated_vec(corresp1, row1, col1)
+        corr_agree = __pixels_close(np.take(corresp0_flat, idx0, axis=0), corrcolor1, corr_atol)
+
+        all_agree = in_bounds & ids_agree & corr_agree
+        is_sane = all_agree != is_occluded
+
+        sanity_type = np.full(rows0.shape, 4, dtype=np.uint8)
+        sanity_type[~ids_agree] = 3
+        sanity_type[~in_bounds] = 2
+        sanity_type[all_agree] = 1
+        sanity_type[is_sane] = 0
+        return sanity_type
+
+    # Checking in chunks keeps the temporaries small
+    rows0 = np.asarray(rows0)
+    cols0 = np.asarray(cols0)
+    sanity_types = np.empty(rows0.shape, dtype=np.uint8)
+    for start in range(0, rows0.shape[0], chunk_size):
+        end = start + chunk_size
+        sanity_types[start:end] = _check_chunk(rows0[start:end], cols0[start:end])
+    return sanity_types
+
+
+@functools.lru_cache(maxsize=8)
+def __resample_params(in_height, in_width, out_height, out_width):
+    """
+    Returns flat indices and weights of the 4 neighbors used by resample_flow; these
+    only depend on the sizes, so are cached for resampling many frames of one size.
     """
-    original_image_size = img.shape
-    in_height = img.shape[0]
-    in_width = img.shape[1]
-    out_height = sz[0]
-    out_width = sz[1]
-    out_flow = np.zeros((out_height, out_width, 2))
     # find scale
     height_scale = float(in_height) / float(out_height)
     width_scale = float(in_width) / float(out_width)
@@ -264,19 +422,53 @@ def resample_flow(img, sz):
     y0 = np.clip(y0, 0, in_height - 1)
     y1 = np.clip(y1, 0, in_height - 1)
 
-    Ia = img[y0, x0, :]
-    Ib = img[y1, x0, :]
-    Ic = img[y0, x1, :]
-    Id = img[y1, x1, :]
+    # Flat indices, to gather from contiguous channels of the flow
+    idx_a = y0 * in_width + x0
+    idx_b = y1 * in_width + x0
+    idx_c = y0 * in_width + x1
+    idx_d = y1 * in_width + x1
 
     wa = (y1 - yy) * (x1 - xx)
     wb = (yy - y0) * (x1 - xx)
     wc = (y1 - yy) * (xx - x0)
     wd = (yy - y0) * (xx - x0)
-    out_flow[:, :, 0] = (Ia[:, :, 0] * wa + Ib[:, :, 0] * wb +
-                         Ic[:, :, 0] * wc + Id[:, :, 0] * wd) * out_width / in_width
-    out_flow[:, :, 1] = (Ia[:, :, 1] * wa + Ib[:, :, 1] * wb +
-                         Ic[:, :, 1] * wc + Id[:, :, 1] * wd) * out_height / in_height
+
+    # Flow is float32, so are the weights, to avoid upcasting the gathered values
+    params = (idx_a, idx_b, idx_c, idx_d) + \
+             tuple(w.astype(np.float32) for w in (wa, wb, wc, wd))
+    for x in params:
+        x.setflags(write=False)  # shared by all calls
+    return params
+
+
+# fast re-sample layer, taken from:
+# https://github.com/liruoteng/OpticalFlowToolkit/blob/master/lib/flowlib.py
+def resample_flow(img, sz, out=None):
+    """
+    img: flow map to be resampled
+    sz: new flow map size. Must be [height,weight]
+    out: optional float32 array of shape [height,weight,2] to write the result into
+    returns: float32 resampled flow map
+    """
+    in_height = img.shape[0]
+    in_width = img.shape[1]
+    out_height = sz[0]
+    out_width = sz[1]
+    if out is None:
+        out_flow = np.empty((out_height, out_width, 2), dtype=np.float32)
+    else:
+        out_flow = out
+
+    idx_a, idx_b, idx_c, idx_d, wa, wb, wc, wd = __resample_params(
+        in_height, in_width, out_height, out_width)
+
+    img_x, img_y = [x.reshape(-1) for x in split_channels(img)]
+    out_flow[:, :, 0] = (np.take(img_x, idx_a) * wa + np.take(img_x, idx_b) * wb +
+                         np.take(img_x, idx_c) * wc + np.take(img_x, idx_d) * wd) \
+                        * out_width / in_width
+    out_flow[:, :, 1] = (np.take(img_y, idx_a) * wa + np.take(img_y, idx_b) * wb +
+                         np.take(img_y, idx_c) * wc + np.take(img_y, idx_d) * wd) \
+                        * out_height / in_height
 
     return out_flow
 
@@ -286,7 +478,8 @@ def resample_objectids(objids, dims):
     objids: uint8 image
     dims: first two components of the shape
     """
-    # Avoid smoothing or distorting colors as much as possible
-    new_shape = (dims[0], dims[1], objids.shape[2])
-    res = resize(objids, new_shape, order=0, mode='constant', preserve_range=True, anti_aliasing=False)
-    return res.astype(np.uint8)  # simple cast
+    # Avoid smoothing or distorting colors as much as possible: nearest neighbor
+    # of output pixel centers, same as skimage resize with order=0
+    rows = ((np.arange(dims[0]) + 0.5) * (objids.shape[0] / float(dims[0]))).astype(np.int64)
+    cols = ((np.arange(dims[1]) + 0.5) * (objids.shape[1] / float(dims[1]))).astype(np.int64)
+    return objids[rows[:, np.newaxis], cols[np.newaxis, :], :].astype(np.uint8, copy=False)
@@ -10,6 +10,8 @@ objects. We run this script on quick-to-render objectid image sequences to
 find frame sequences where motion is present.
 """
 import argparse
+import collections
+import concurrent.futures
 import glob
 import numpy as np
 import os
@@ -30,8 +32,11 @@ if __name__ == "__main__":
         '--output_info_file', action='store', type=str, required=True,
         help='Will write frame limits here.')
     parser.add_argument(
-        '--min_changed_pixel_frac', action='store', default=0.07,
+        '--min_changed_pixel_frac', action='store', type=float, default=0.07,
         help='Minimum fraction of pixels that are changed in order to detect motion.')
+    parser.add_argument(
+        '--nthreads', action='store', type=int, default=2,
+        help='Number of threads reading frames ahead while frames are compared.')
     args = parser.parse_args()
 
     input_files = glob.glob(args.ids_images)
@@ -48,9 +53,9 @@ if __name__ == "__main__":
         frame = int(r.group(1))
         return frame
 
-    prev_img = imread(input_files[0]).astype(np.uint8)
-    prev_num = parse_frame_number(input_files[0])
-    npixels = prev_img.shape[0] * prev_img.shape[1]
+    def read_ids(infile):
+        # Ids images are usually uint8 already and need no copy
+        return imread(infile).astype(np.uint8, copy=False)
 
     sequences = []
     start_frame = -1
@@ -61,26 +66,44 @@ if __name__ == "__main__":
         else:  # extend if previous sequence ended recently
             sequences[-1][1] = new_seq[1]
 
-    for i in range(1, len(input_files)):
-        img = imread(input_files[i]).astype(np.uint8)
-        num = parse_frame_number(input_files[i])
-
-        if num != prev_num + 1:
-            raise RuntimeError('Inconsistent frame numbers %s (%d) follows %s (%d)' %
-                               (input_files[i], num, input_files[i-1], prev_num))
-
-        diff = np.sum(np.nonzero(
-            np.sum(np.abs(prev_img - img), axis=2))) / float(npixels)
-        if diff > args.min_changed_pixel_frac:
-            if start_frame < 0:
-                start_frame = num - 1
-        else:
-            if start_frame >= 0:
-                __add_sequence([start_frame, num - 1])
-                start_frame = -1
-
-        prev_img = img
-        prev_num = num
+    # Up to max_pending upcoming frames are read in the background while the
+    # current one is compared
+    max_pending = 2 * args.nthreads
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.nthreads) as executor:
+        def read_ahead(i):
+            if i < len(input_files):
+                pending.append(executor.submit(read_ids, input_files[i]))
+
+        for i in range(max_pending):
+            read_ahead(i)
+
+        prev_img = pending.popleft().result()
+        read_ahead(max_pending)
+        prev_num = parse_frame_number(input_files[0])
+        npixels = prev_img.shape[0] * prev_img.shape[1]
+
+        for i in range(1, len(input_files)):
+            img = pending.popleft().result()
+            read_ahead(i + max_pending)
+            num = parse_frame_number(input_files[i])
+
+            if num != prev_num + 1:
+                raise RuntimeError('Inconsistent frame numbers %s (%d) follows %s (%d)' %
+                                   (input_files[i], num, input_files[i-1], prev_num))
+
+            # Fraction of pixels where any channel changed, compared in one pass
+            diff = np.count_nonzero((prev_img != img).any(axis=2)) / float(npixels)
+            if diff > args.min_changed_pixel_frac:
+                if start_frame < 0:
+                    start_frame = num - 1
+            else:
+                if start_frame >= 0:
+                    __add_sequence([start_frame, num - 1])
+                    start_frame = -1
+
+            prev_img = img
+            prev_num = num
 
     if start_frame >= 0:
         __add_sequence([start_frame, prev_num])
@@ -23,6 +23,15 @@ class BBox:
         self.maxs = maxs
 
 
+    @staticmethod
+    def from_points(points):
+        """
+        Creates the bounding box of N x 3 points.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+        return BBox(points.min(axis=0).tolist(), points.max(axis=0).tolist())
+
+
     def get_center(self):
         return list(map(lambda mx, mi: (mx + mi) / 2.0, self.maxs, self.mins))
 
@@ -165,6 +174,21 @@ def get_camera_by_number(camera_number):
     return None
 
 
+def __get_obj_corners(obj, obj_space=False, local_corners=None):
+    """
+    Returns 8 x 3 array of the object's bounding box corners, in world
+    space unless obj_space; local_corners can provide previously read
+    object space corners.
+    """
+    corners = local_corners
+    if corners is None:
+        corners = np.array([tuple(b) for b in obj.bound_box], dtype=np.float64)
+    if not obj_space:
+        mat = np.array(obj.matrix_world, dtype=np.float64)
+        corners = corners.dot(mat[:3, :3].T) + mat[:3, 3]
+    return corners
+
+
 def get_obj_bbox(obj, obj_space=False):
     """
     Gets the bounding box for a single object.
@@ -175,23 +199,7 @@ def get_obj_bbox(obj, obj_space=False):
     Output:
     bbox - A BBox object
     """
-    mins = []
-    maxs = []
-
-    if obj_space:
-        bbox = [Vector(b) for b in obj.bound_box]
-    else:
-        mat = obj.matrix_world
-        bbox = [mat * Vector(b) for b in obj.bound_box]
-
-    mins.append(min(b.x for b in bbox))
-    maxs.append(max(b.x for b in bbox))
-    mins.append(min(b.y for b in bbox))
-    maxs.append(max(b.y for b in bbox))
-    mins.append(min(b.z for b in bbox))
-    maxs.append(max(b.z for b in bbox))
-    bbox = BBox(mins, maxs)
-    return bbox
+    return BBox.from_points(__get_obj_corners(obj, obj_space=obj_space))
 
 
 def get_scene_bbox():
@@ -202,27 +210,30 @@ def get_scene_bbox():
     Output:
     bbox - A BBox object
     """
-    mins = [float("inf"), float("inf"), float("inf")]
-
-    maxs = [float("-inf"), float("-inf"), float("-inf")]
-
     # Deselect all objects
     for ob in bpy.context.selected_objects:
         ob.select = False
 
-    # Get all mesh names
-    mesh_names = [v for v in bpy.context.scene.objects if v.type == 'MESH']
+    return __get_meshes_bbox()
 
-    for j in range(0, len(mesh_names)):
-        ob = mesh_names[j]
-        cube = get_obj_bbox(ob)
-        for i in range(3):
-            mins[i] = cube.mins[i] if cube.mins[i] < mins[i] else mins[i]
-            maxs[i] = cube.maxs[i] if cube.maxs[i] > maxs[i] else maxs[i]
+
+def __get_meshes_bbox(local_corners=None):
+    """
+    Gets the bounding box of all meshes in the scene; local_corners can map
+    mesh names to previously read object space corners.
+    """
+    meshes = [v for v in bpy.context.scene.objects if v.type == 'MESH']
+    if len(meshes) == 0:
+        return BBox([float("inf")] * 3, [float("-inf")] * 3)
+
+    # Corners of all meshes are reduced at once, rather than merging boxes one by one
+    corners = np.empty((len(meshes) * 8, 3), dtype=np.float64)
+    for j, ob in enumerate(meshes):
+        corners[j * 8:(j + 1) * 8, :] = __get_obj_corners(
+            ob, local_corners=(local_corners.get(ob.name) if local_corners else None))
 
     # Create bounding box representation
-    bbox = BBox(mins, maxs)
-    return bbox
+    return BBox.from_points(corners)
 
 
 def distance_from_camera_center(bbox, cam):
@@ -240,9 +251,16 @@ def get_scene_bbox_animated():
 
     scene.frame_set(scene.frame_start)
     bbox = get_scene_bbox()
+
+    # Object space corners of meshes that are not deformed are the same in every
+    # frame, so only their world matrix needs to be read again for every frame
+    static_corners = {ob.name: __get_obj_corners(ob, obj_space=True)
+                      for ob in scene.objects
+                      if (ob.type == 'MESH' and len(ob.modifiers) == 0 and
+                          ob.data.shape_keys is None)}
     for i in range(scene.frame_start + 1, scene.frame_end):
         scene.frame_set(i)
-        bbox.merge_with(get_scene_bbox())
+        bbox.merge_with(__get_meshes_bbox(static_corners))
     return bbox
 
 
@@ -434,6 +452,17 @@ def get_single_camera_or_die():
     return camera
 
 
+def pack_images():
+    """
+    Packs all external image files into the blend. Unlike bpy.ops.file.pack_all,
+    does not go through operator dispatch and only looks at images, which are
+    the only external data in our generated scenes.
+    """
+    for img in bpy.data.images:
+        if img.source == 'FILE' and img.packed_file is None and len(img.filepath) > 0:
+            img.pack()
+
+
 def save_blend(filename):
     """
     Saves current blend to file.
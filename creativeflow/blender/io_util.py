@@ -18,6 +18,33 @@ FLO_FILE_UNKNOWN_FLOW_THRESH = math.exp(9)
 # value to use to represent unknown flow
 FLO_FLOW_UNKNOWN_FLOW = math.exp(10)
 
+# bytes of array data passed to the compressor at a time
+COMPRESS_CHUNK_BYTES = 1 << 24
+
+# frame number in filenames like flow000001.flo
+FRAMENUMBER_PATTERN = re.compile(r'[a-z_]+([0-9]+)\.[a-zA-Z]+')
+
+
+def __read_flow_header(file, flo_filename):
+    """
+    Reads and checks the header of a .flo file; returns width, height.
+    """
+    tag = struct.unpack('<f',file.read(4))[0]
+    width = struct.unpack('<i',file.read(4))[0]
+    height = struct.unpack('<i', file.read(4))[0]
+
+    if tag != FLO_FILE_TAG_FLOAT:  # Simple test for correct endian
+        raise ValueError("Wrong tag {0}".format_map(tag))
+
+    # Check to sees integers were read correctly
+    if width < 1 or width > 99999:
+        raise ValueError("Wrong width {0} when reading from flow {1}".format(
+            width, flo_filename))
+    if height < 1 or height > 99999:
+        raise ValueError("Wrong heigth {0} when reading from flow {1}".format(
+            width, flo_filename))
+    return width, height
+
 
 def read_flow(flo_filename, slow_unpacking=False):
     """
@@ -26,7 +53,7 @@ def read_flow(flo_filename, slow_unpacking=False):
 
     Input:
     :param flo_filename: where to read flow from.
-    :param slow_unpacking: reads values one at a time, ensuring data is
+    :param slow_unpacking: converts values to native byte order, ensuring data is
                            read correctly even on big-endian architectures.
 
     Output:
@@ -47,21 +74,7 @@ def read_flow(flo_filename, slow_unpacking=False):
         flow - numpy array of size width x height x 2
     """
     file = open(flo_filename, 'rb')
-
-    tag = struct.unpack('<f',file.read(4))[0]
-    width = struct.unpack('<i',file.read(4))[0]
-    height = struct.unpack('<i', file.read(4))[0]
-
-    if tag != FLO_FILE_TAG_FLOAT:  # Simple test for correct endian
-        raise ValueError("Wrong tag {0}".format_map(tag))
-
-    # Check to sees integers were read correctly
-    if width < 1 or width > 99999:
-        raise ValueError("Wrong width {0} when reading from flow {1}".format(
-            width, flo_filename))
-    if height < 1 or height > 99999:
-        raise ValueError("Wrong heigth {0} when reading from flow {1}".format(
-            width, flo_filename))
+    width, height = __read_flow_header(file, flo_filename)
 
     # Check endianness
     if sys.byteorder != 'little' and not slow_unpacking:
@@ -69,13 +82,12 @@ def read_flow(flo_filename, slow_unpacking=False):
             'For non-little endian architecture (%s), run read_flow with slow_unpacking=True' % sys.byteorder)
 
     if slow_unpacking:
-        flow = np.zeros((height, width, 2), dtype=np.float32)
-        for x in range(height):
-            for y in range(width):
-                data = file.read(4 * 2)
-                if data == "":
-                    raise ValueError("Flow file {0} is too short".format(flo_filename))
-                flow[x][y] = np.array(struct.unpack('<'+'f'*2, data), dtype=np.float32)
+        # Values are read as little-endian floats explicitly, then converted to
+        # native byte order in a single pass
+        data = np.fromfile(file, np.dtype('<f4'), count=2 * width * height)
+        if data.size != 2 * width * height:
+            raise ValueError("Flow file {0} is too short".format(flo_filename))
+        flow = data.astype(np.float32).reshape((height, width, 2))
     else:
         data = np.fromfile(file, np.float32, count=2 * width * height)
         flow = np.resize(data, (height, width, 2))
@@ -84,6 +96,57 @@ def read_flow(flo_filename, slow_unpacking=False):
     return flow
 
 
+def read_flows(flo_filenames, out=None):
+    """
+    Reads a sequence of flows of the same size, as written by write_flow,
+    directly into one N x H x W x 2 float32 array with no per-flow allocation.
+
+    Input:
+    :param flo_filenames: list of N flow files to read
+    :param out: optional preallocated N x H x W x 2 float32 array to read into;
+                if not set, allocated based on the first flow's size
+
+    Output:
+    N x H x W x 2 float32 array of flows (out, if set)
+    """
+    if sys.byteorder != 'little':
+        raise RuntimeError(
+            'For non-little endian architecture (%s), use read_flow with slow_unpacking=True' % sys.byteorder)
+
+    for i, flo_filename in enumerate(flo_filenames):
+        with open(flo_filename, 'rb') as file:
+            width, height = __read_flow_header(file, flo_filename)
+
+            if out is None:
+                out = np.empty((len(flo_filenames), height, width, 2), dtype=np.float32)
+            if out.shape[1:] != (height, width, 2) or out.dtype != np.float32 or not out.flags.c_contiguous:
+                raise RuntimeError('Cannot read flow %s of size %dx%d into %s array of shape %s' %
+                                   (flo_filename, width, height, str(out.dtype), str(out.shape)))
+
+            nbytes = width * height * 2 * 4
+            if file.readinto(memoryview(out[i]).cast('B')) != nbytes:
+                raise ValueError("Flow file {0} is too short".format(flo_filename))
+
+    return out
+
+
+def read_flow_mmap(flo_filename):
+    """
+    Same as read_flow, but memory maps the flow data instead of copying it,
+    which is faster for flows that are read once. Returns a read-only
+    H x W x 2 float32 array; only supported on little-endian architectures.
+    """
+    if sys.byteorder != 'little':
+        raise RuntimeError(
+            'For non-little endian architecture (%s), use read_flow with slow_unpacking=True' % sys.byteorder)
+
+    with open(flo_filename, 'rb') as file:
+        width, height = __read_flow_header(file, flo_filename)
+
+    return np.memmap(flo_filename, dtype=np.float32, mode='r', offset=12,
+                     shape=(height, width, 2))
+
+
 def write_flow(flow, flo_filename, slow_packing=False):
     """
     Outputs the flow into a flo_file.
@@ -91,7 +154,7 @@ def write_flow(flow, flo_filename, slow_packing=False):
     Input:
         :param flow: 2D numpy array with 2 bands
         :param flo_filename: the full path and file name of the file to be outputed
-        :param slow_packing: writes values one at a time, ensuring data is
+        :param slow_packing: converts values to little-endian, ensuring data is
                              stored correctly even on big-endian architectures.
     """
 
@@ -113,15 +176,11 @@ def write_flow(flow, flo_filename, slow_packing=False):
     file.write(struct.pack('<i', height))
 
     # Write the rest of the data
+    # Row-major H x W x 2 values are already interleaved as the format expects
     if slow_packing:
-        for x in range(height):
-            for y in range(width):
-                file.write(struct.pack('<'+'f'*2, flow[x][y][0], flow[x][y][1]))
+        flow.astype(np.dtype('<f4')).tofile(file)
     else:
-        tmp = np.zeros((height, width * 2), dtype=np.float32)
-        tmp[:, np.arange(width) * 2] = flow[:, :, 0]
-        tmp[:, np.arange(width) * 2 + 1] = flow[:, :, 1]
-        tmp.astype(np.float32).tofile(file)
+        np.ascontiguousarray(flow, dtype=np.float32).tofile(file)
 
     file.close()
 
@@ -136,16 +195,27 @@ def strip_blender_name(name):
     return re.sub(r'_A(\:[a-z]+)?$', '', re.sub(r'\.[0-9]+$', '', name))
 
 
-def compress_flows(dirname, zipfilename):
+def compress_flows(dirname, zipfilename, compresslevel=None):
     fnames = glob.glob(os.path.join(dirname, '*.flo'))
     fnames.sort()
 
-    flows = []
+    # Headers are checked up front, so that flows of mismatched size fail before
+    # anything is written to the zip
+    shape = None
     for f in fnames:
-        flows.append(np.expand_dims(read_flow(f), axis=0))
+        with open(f, 'rb') as file:
+            width, height = __read_flow_header(file, f)
+        if shape is None:
+            shape = (height, width, 2)
+        elif shape != (height, width, 2):
+            raise RuntimeError('Flow %s of size %dx%d does not match size %dx%d of other flows in %s' %
+                               (f, width, height, shape[1], shape[0], dirname))
+    if shape is None:
+        raise RuntimeError('No flows found in %s' % dirname)
 
-    F = np.concatenate(flows)
-    compress_4dnparray(F, zipfilename)
+    # Flows are read one at a time into the same buffer and streamed into the zip
+    buf = np.empty((1,) + shape, dtype=np.float32)
+    __write_4dnparray_zip((read_flows([f], out=buf)[0] for f in fnames), shape, zipfilename, compresslevel)
 
 
 def decompress_flows(zipfilename, output_dir=None, outfile_pattern='flow%06d.flo'):
@@ -161,7 +231,7 @@ def decompress_flows(zipfilename, output_dir=None, outfile_pattern='flow%06d.flo
 
 
 # E.g. read_function=skimage.io.imread
-def compress_images(dirname, zipfilename, read_function):
+def compress_images(dirname, zipfilename, read_function, compresslevel=None):
     fnames = glob.glob(os.path.join(dirname, '*.png'))
     fnames.sort()
 
@@ -170,7 +240,7 @@ def compress_images(dirname, zipfilename, read_function):
         images.append(np.expand_dims(read_function(f), axis=0))
 
     F = np.concatenate(images)
-    compress_4dnparray(F, zipfilename)
+    compress_4dnparray(F, zipfilename, compresslevel)
 
 
 # E.g. write_function=skimage.io.imsave
@@ -186,7 +256,7 @@ def decompress_images(zipfilename, write_function, output_dir=None, outfile_patt
     return images
 
 
-def compress_arrays(dirname, shape, zipfilename, extension='.array'):
+def compress_arrays(dirname, shape, zipfilename, extension='.array', compresslevel=None):
     fnames = glob.glob(os.path.join(dirname, '*' + extension))
     fnames.sort()
 
@@ -198,7 +268,7 @@ def compress_arrays(dirname, shape, zipfilename, extension='.array'):
         arrays.append(arr)
 
     F = np.concatenate(arrays)
-    compress_4dnparray(F, zipfilename)
+    compress_4dnparray(F, zipfilename, compresslevel)
 
 
 def decompress_arrays(zipfilename, output_dir=None, outfile_pattern='meta%06d.array'):
@@ -215,34 +285,61 @@ def decompress_arrays(zipfilename, output_dir=None, outfile_pattern='meta%06d.ar
     return arrays
 
 
-def compress_4dnparray(F, zipfilename):
+def compress_4dnparray(F, zipfilename, compresslevel=None):
     """
     Compresses array of size:
     nitems x width x height x nchannels
+
+    compresslevel is the deflate level 1..9 (zlib default if None; other
+    levels need Python 3.7); level 1 is several times faster and nearly as
+    small for typical flow and depth, and 0 stores the data uncompressed.
     """
     if len(F.shape) != 4:
         raise RuntimeError('Compressed array must have 4 dimensions, but is %s' % str(F.shape))
 
-    width = F.shape[1]
-    height = F.shape[2]
-    nchannels = F.shape[3]
-    F = np.reshape(F, [-1])
-
-    # Write the giant NP file
-    zipfileprefix = zipfilename.strip('.zip')
-    tmpfilename = zipfileprefix + '.tmp.npbinary'
-    F.tofile(tmpfilename)
-
-    innerfilename = 'data.%d.%d.%d.binary' % (width, height, nchannels)
-    zf = zipfile.ZipFile(zipfilename, "w", zipfile.ZIP_DEFLATED, allowZip64=True)
-    zf.write(tmpfilename, '/' + innerfilename)
-    zf.close()
+    __write_4dnparray_zip(F, F.shape[1:], zipfilename, compresslevel)
 
-    os.remove(tmpfilename)
 
+def __write_4dnparray_zip(items, item_shape, zipfilename, compresslevel=None):
+    """
+    Streams a sequence of width x height x nchannels items into a zip
+    in the format written by compress_4dnparray, holding one item at a time.
+    """
+    width, height, nchannels = item_shape
 
-def decompress_4dnparray(zipfilename, dtype=np.float32):
-    zf = zipfile.ZipFile(zipfilename, 'r', allowZip64=True)
+    # Stream the giant NP array into the zip, without a temporary file
+    innerfilename = 'data.%d.%d.%d.binary' % (width, height, nchannels)
+    compression = zipfile.ZIP_DEFLATED
+    zip_kwargs = {}
+    if compresslevel == 0:
+        compression = zipfile.ZIP_STORED
+    elif compresslevel is not None:
+        zip_kwargs['compresslevel'] = compresslevel
+    with zipfile.ZipFile(zipfilename, "w", compression, allowZip64=True, **zip_kwargs) as zf:
+        if sys.version_info >= (3, 6):
+            with zf.open(innerfilename, 'w', force_zip64=True) as fp:
+                __write_items(fp, items)
+        else:
+            # Writing zip entries as a stream needs Python 3.6; go through a temporary file
+            tmpfilename = zipfilename + '.tmp.npbinary'
+            with open(tmpfilename, 'wb') as fp:
+                __write_items(fp, items)
+            zf.write(tmpfilename, innerfilename)
+            os.remove(tmpfilename)
+
+
+def __write_items(fp, items):
+    for item in items:
+        data = memoryview(np.ascontiguousarray(item)).cast('B')
+        for start in range(0, len(data), COMPRESS_CHUNK_BYTES):
+            fp.write(data[start:start + COMPRESS_CHUNK_BYTES])
+
+
+def __parse_4dnparray_zip(zf, zipfilename):
+    """
+    Returns inner filename and width, height, nchannels of the
+    array compressed with compress_4dnparray.
+    """
     names = zf.namelist()
 
     # Decode flow dimensions from the inner filename
@@ -257,26 +354,61 @@ def decompress_4dnparray(zipfilename, dtype=np.float32):
             'Expected inner zip filename to match %s in zip: %s' %
             (pattern, zipfilename))
 
-    width = int(r.group(1))
-    height = int(r.group(2))
-    nchannels = int(r.group(3))
+    return names[0], int(r.group(1)), int(r.group(2)), int(r.group(3))
 
-    # Read the actual data
-    tmp_dir = os.path.dirname(zipfilename)
-    zf.extract(names[0], tmp_dir)
-    zf.close()
 
-    extracted_file = os.path.join(tmp_dir, names[0])
-    F = np.fromfile(extracted_file, dtype=dtype)
-    os.remove(extracted_file)
+def decompress_4dnparray(zipfilename, dtype=np.float32):
+    with zipfile.ZipFile(zipfilename, 'r', allowZip64=True) as zf:
+        name, width, height, nchannels = __parse_4dnparray_zip(zf, zipfilename)
+
+        # Decompress straight into the output array, without extracting to disk
+        nbytes = zf.getinfo(name).file_size
+        F = np.empty(nbytes // np.dtype(dtype).itemsize, dtype=dtype)
+        buf = memoryview(F).cast('B')
+        with zf.open(name) as fp:
+            nread = 0
+            while nread < nbytes:
+                n = fp.readinto(buf[nread:nread + COMPRESS_CHUNK_BYTES])
+                if n == 0:
+                    raise RuntimeError('Truncated data in zip %s' % zipfilename)
+                nread += n
 
     F = F.reshape([-1, width, height, nchannels])
     return F
 
 
+def iter_decompressed_4dnparray(zipfilename, dtype=np.float32):
+    """
+    Same as decompress_4dnparray, but streams the zip and yields one
+    width x height x nchannels item at a time, so that only one item is
+    held in memory.
+    """
+    with zipfile.ZipFile(zipfilename, 'r', allowZip64=True) as zf:
+        name, width, height, nchannels = __parse_4dnparray_zip(zf, zipfilename)
+        item_shape = (width, height, nchannels)
+        item_bytes = width * height * nchannels * np.dtype(dtype).itemsize
+
+        with zf.open(name) as fp:
+            while True:
+                buf = bytearray(item_bytes)
+                nread = fp.readinto(buf)
+                if nread == 0:
+                    break
+                if nread != item_bytes:
+                    raise RuntimeError('Truncated data in zip %s' % zipfilename)
+                yield np.frombuffer(buf, dtype=dtype).reshape(item_shape)
+
+
+def iter_decompressed_flows(zipfilename):
+    """
+    Same as decompress_flows, but yields one flow at a time.
+    """
+    return iter_decompressed_4dnparray(zipfilename)
+
+
 def get_filename_framenumber(infile):
     bname = os.path.basename(infile)
-    r = re.match(r'[a-z_]+([0-9]+)\.[a-zA-Z]+', bname)
+    r = FRAMENUMBER_PATTERN.match(bname)
     if r is None:
         return None
     elif len(r.groups()) == 0:
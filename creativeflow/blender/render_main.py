@@ -242,7 +242,7 @@ if __name__ == "__main__":
             random.seed(args.random_seed)
         else:
             print('Using time as random seed.')
-            random.seed(time.time())
+            random.seed(int(time.time() * 1000000))
 
         render_util.print_blend_diagnostics()
 
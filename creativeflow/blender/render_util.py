@@ -301,12 +301,13 @@ def get_global_vertex_group_bbox(vg_name):
             if vg_name in ob.vertex_groups:
                 vg_idx = ob.vertex_groups[vg_name].index
                 vs = [v for v in ob.data.vertices if vg_idx in [vg.group for vg in v.groups]]
-                for v in vs:
-                    coord = [v.co.x, v.co.y, v.co.z]
-                    if bbox:
-                        bbox.expand_to_contain(coord)
-                    else:
-                        bbox = geo_util.BBox(coord, coord)
+                if len(vs) == 0:
+                    continue
+                vg_bbox = geo_util.BBox.from_points([(v.co.x, v.co.y, v.co.z) for v in vs])
+                if bbox:
+                    bbox.merge_with(vg_bbox)
+                else:
+                    bbox = vg_bbox
     return bbox
 
 
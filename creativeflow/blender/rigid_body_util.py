@@ -18,10 +18,11 @@ def set_random_physical_properties(objects):
     restitution = random.uniform(0.01, 0.45)
 
     for obj in objects:
-        obj.rigid_body.friction = friction
-        obj.rigid_body.restitution = restitution
-        obj.rigid_body.use_margin = True
-        obj.rigid_body.mass = random.uniform(0.5, 7.0)
+        rb = obj.rigid_body  # each RNA attribute access is a lookup
+        rb.friction = friction
+        rb.restitution = restitution
+        rb.use_margin = True
+        rb.mass = random.uniform(0.5, 7.0)
 
     if len(objects) == 1:
         objects[0].rotation_euler[2] = random.uniform(0, math.pi * 2)
@@ -62,6 +62,9 @@ if __name__ == "__main__":
     parser.add_argument(
         '--depth_zip', action='store', type=str, default='',
         help='If set, will compress depth into a special zip; only runs if also --depth_odir.')
+    parser.add_argument(
+        '--zip_compress_level', action='store', type=int, default=None,
+        help='Deflate level (1-9) for the zips above, or 0 to store uncompressed; zlib default if not set.')
 
     args = parser.parse_args()
 
@@ -88,6 +91,7 @@ if __name__ == "__main__":
     qtimer.end()
     dshape = meta['depth'].shape
     depth_range = None
+    occ = None
     for i in range(len(files) - 1):
         fname = files[i]
         qtimer.start('I/O')
@@ -119,8 +123,9 @@ if __name__ == "__main__":
         if len(args.occlusions_odir) > 0:
             occ_fname = _make_ofile(fname, args.occlusions_odir, 'png', 'occlusions')
             qtimer.start('occlusions_compute')
+            # All frames have the same size, so the occlusions buffer is reused
             occ = flow_util.get_occlusions_vec(meta['flow'], meta2['back_flow'],
-                                               pixel_threshold=0.5)
+                                               pixel_threshold=0.5, out=occ)
             qtimer.end()
             qtimer.start('I/O')
             imsave(occ_fname, occ)
@@ -141,19 +146,20 @@ if __name__ == "__main__":
         if len(args.flow_odir) == 0:
             raise RuntimeError('Sorry; --flow_zip is only written if --flow_odir is set.')
         else:
-            io_util.compress_flows(args.flow_odir, args.flow_zip)
+            io_util.compress_flows(args.flow_odir, args.flow_zip, compresslevel=args.zip_compress_level)
 
     if len(args.back_flow_zip) > 0:
         if len(args.back_flow_odir) == 0:
             raise RuntimeError('Sorry; --back_flow_zip is only written if --back_flow_odir is set.')
         else:
-            io_util.compress_flows(args.back_flow_odir, args.back_flow_zip)
+            io_util.compress_flows(args.back_flow_odir, args.back_flow_zip, compresslevel=args.zip_compress_level)
 
     if len(args.depth_zip) > 0:
         if len(args.depth_odir) == 0:
             raise RuntimeError('Sorry; --depth_zip is only written if --depth_odir is set.')
         else:
-            io_util.compress_arrays(args.depth_odir, dshape, args.depth_zip)
+            io_util.compress_arrays(args.depth_odir, dshape, args.depth_zip,
+                                    compresslevel=args.zip_compress_level)
     qtimer.end()
 
     print(qtimer.summary())
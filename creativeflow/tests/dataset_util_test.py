@@ -3,6 +3,7 @@
 import unittest
 import os
 import re
+import tempfile
 
 import creativeflow.blender.dataset_util as dataset_util
 
@@ -123,6 +124,14 @@ class SequenceInfoTest(unittest.TestCase):
             self.assertGreater(len(seq_path), 0,
                                msg='Got empty path for data type %s' % str(data_type))
 
+        base_dir = os.path.join('data', '100%')
+        self.assertEqual(os.path.join(base_dir, 'ZombieScene', 'cam0', 'metadata', 'flow', 'flow000006.flo'),
+                         seq.get_meta_path(dataset_util.DataType.FLOW, frame_idx=5, base_dir=base_dir))
+        self.assertEqual(os.path.join(base_dir, 'ZombieScene', 'cam0', 'renders', 'shading', 'shading1.paint1',
+                                      'frame000004.png'),
+                         seq.get_render_path(dataset_util.DataType.RENDER_SHADING, style_idx=1, frame_idx=3,
+                                             base_dir=base_dir))
+
     def test_exclude_include_frames(self):
         seq = dataset_util.SequenceInfo('ZombieScene', 'mixamo', 7, 0,
                                         shading_styles=['ink0', 'paint1'],
@@ -232,6 +241,50 @@ class DatasetHelperTest(unittest.TestCase):
         self.assertEqual(set(all_paths), set(all_paths1))
         self.assertEqual(set(all_paths), set(all_paths2))
 
+    def test_read_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('scene_name|scene_source|nframes|tags\n')
+            f.write('Rockin\'Zombie|mixamo|30|good\n')
+            f.write('\n')
+            f.write('moonrocket|web|15\n')
+        rows = list(dataset_util.DatasetHelper.read_rows(f.name))
+        os.remove(f.name)
+
+        self.assertEqual(2, len(rows))
+        self.assertEqual({'scene_name': 'Rockin\'Zombie', 'scene_source': 'mixamo', 'nframes': '30', 'tags': 'good'},
+                         rows[0])
+        self.assertEqual({'scene_name': 'moonrocket', 'scene_source': 'web', 'nframes': '15', 'tags': ''},
+                         rows[1])
+
+    def test_get_sequence_info_batch(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('scene_name|scene_source|nframes|cam_idx|nstyles|has_flow|shading_styles|line_styles|'
+                    'included_frames\n')
+            f.write('Zombie|mixamo|30|0|2|OK|ink0,paint1|pencil0,pen5|0,1,2,5,7,29\n')
+            f.write('moonrocket|web|15|0|1|OK|pastels1|marker1|0,3,4,5,6,7,8,9,10,11,12,13,14\n')
+            f.write('bunny|web|10|1|3|OK|ink0,paint1,flat|pencil0,pen5,pen0|3,4,9\n')
+        helper = dataset_util.DatasetHelper(f.name)
+        os.remove(f.name)
+        self.assertEqual(3, helper.num_sequences())
+        self.assertIsNone(helper.frames_per_sequence)
+        self.assertEqual(28, helper.num_frames_in_all_styles())
+
+        seq_idx, style_idx, frame_idx = helper.get_sequence_info_batch([0, 7, 10, 27])
+        self.assertEqual([0, 0, 1, 2], list(seq_idx))
+        self.assertEqual([0, 1, 0, 2], list(style_idx))
+        self.assertEqual([0, 2, 0, 4], list(frame_idx))
+
+        global_frames = list(range(helper.num_frames_in_all_styles()))
+        seq_idx, style_idx, frame_idx = helper.get_sequence_info_batch(global_frames)
+        for i in global_frames:
+            seq, expected_style_idx, expected_frame_idx = helper.get_sequence_info(i)
+            self.assertIs(seq, helper.sequences[seq_idx[i]])
+            self.assertEqual(expected_style_idx, style_idx[i])
+            self.assertEqual(expected_frame_idx, frame_idx[i])
+
+        with self.assertRaises(RuntimeError):
+            helper.get_sequence_info_batch([0, helper.num_frames_in_all_styles()])
+
     def test_style_filtering(self):
         seq_file = get_test_data_path('mock_sequence_list.txt')
         helper = dataset_util.DatasetHelper(
@@ -5,6 +5,7 @@ import unittest
 import numpy as np
 import os
 from skimage.io import imread, imsave
+from skimage.transform import resize
 
 import creativeflow.blender.flow_util as flow_util
 import creativeflow.blender.io_util as io_util
@@ -77,11 +78,11 @@ class FlowUtilTest(unittest.TestCase):
         expected[0,0,:] = expected0
         expected[0,1,:] = expected1
         expected[1,0,:] = expected2
-        expected_invalid = np.array([[0,0],[0,1]], dtype=np.int32)
+        expected_invalid = np.array([[False,False],[False,True]])
         actual_val, actual_invalid = flow_util.get_val_interpolated_vec(ff, rows, cols,
                                                                         fill_val=0.0)
         np.testing.assert_array_almost_equal(expected, actual_val)
-        np.testing.assert_array_almost_equal(expected_invalid, actual_invalid)
+        np.testing.assert_array_equal(expected_invalid, actual_invalid)
 
     def test_get_occlusions(self):
         # Frame 0:       Frame 1:
@@ -122,6 +123,44 @@ class FlowUtilTest(unittest.TestCase):
         occ_actual = flow_util.get_occlusions_vec(ff0, bf1)
         np.testing.assert_array_equal(occ_expected, occ_actual)
 
+        # Test vectorized version writing into a reused buffer
+        occ_buffer = np.full((4, 4), 100, dtype=np.uint8)
+        occ_actual = flow_util.get_occlusions_vec(ff0, bf1, out=occ_buffer)
+        self.assertIs(occ_buffer, occ_actual)
+        np.testing.assert_array_equal(occ_expected, occ_actual)
+
+    def test_split_channels(self):
+        img = np.arange(24, dtype=np.float32).reshape((2, 4, 3))
+        channels = flow_util.split_channels(img)
+        self.assertEqual(3, len(channels))
+        for ch in range(3):
+            np.testing.assert_array_equal(img[:, :, ch], channels[ch])
+            self.assertTrue(channels[ch].flags['C_CONTIGUOUS'])
+
+    def test_cross_check_sanity_batch(self):
+        np.random.seed(0)
+        rows = 20
+        cols = 30
+        flow = ((np.random.rand(rows, cols, 2) - 0.5) * 6).astype(np.float32)
+        flow[5:15, 5:15, :] = 1.0
+        ids0 = (np.random.rand(rows, cols, 3) > 0.9).astype(np.uint8) * 255
+        ids1 = np.roll(ids0, (1, 1), axis=(0, 1))
+        corr0 = (np.random.rand(rows, cols, 3) * 255).astype(np.uint8)
+        corr1 = np.roll(corr0, (1, 1), axis=(0, 1))
+        occ = ((np.random.rand(rows, cols) > 0.7) * 255).astype(np.uint8)
+
+        r, c = np.nonzero(np.ones((rows, cols)))
+        actual = flow_util.cross_check_sanity_batch(flow, ids0, ids1, corr0, corr1, occ, r, c)
+        expected = [flow_util.cross_check_sanity(flow, ids0, ids1, corr0, corr1, occ, r[i], c[i],
+                                                 output_sanity_type=True)
+                    for i in range(len(r))]
+        np.testing.assert_array_equal(np.array(expected), actual)
+        self.assertEqual(5, len(set(expected)))  # Test data sanity
+
+        actual = flow_util.cross_check_sanity_batch(flow, ids0, ids1, corr0, corr1, occ, r, c,
+                                                    chunk_size=7)
+        np.testing.assert_array_equal(np.array(expected), actual)
+
     def get_unique_colors(self, img):
         return np.unique(img.reshape(-1, img.shape[2]), axis=0)
 
@@ -186,6 +225,16 @@ class FlowUtilTest(unittest.TestCase):
                         '(%s) Expected less than %0.1f pixels to differ, but %d pixels disagree' %
                         (msg, max_disagreement, unequal_pixels))
 
+    def test_resample_objectids_nearest(self):
+        np.random.seed(0)
+        for in_dims, out_dims in [((12, 8), (8, 12)), ((2, 2), (3, 3)), ((750, 750), (500, 500))]:
+            ids = (np.random.rand(in_dims[0], in_dims[1], 3) * 255).astype(np.uint8)
+            expected = resize(ids, (out_dims[0], out_dims[1], 3), order=0, mode='constant',
+                              preserve_range=True, anti_aliasing=False).astype(np.uint8)
+            actual = flow_util.resample_objectids(ids, out_dims)
+            self.assertEqual(np.uint8, actual.dtype)
+            np.testing.assert_array_equal(expected, actual)
+
     def test_resample(self):
         testcases = [ 'bunny_teapot_frame2', 'bunny_teapot_frame7', 'character_frame1', 'character_frame5']
         for prefix in testcases:
@@ -7,7 +7,6 @@ import random
 import tempfile
 import numpy as np
 from skimage.io import imsave, imread
-from datetime import datetime
 import sys
 
 import creativeflow.blender.io_util as io_util
@@ -24,7 +23,7 @@ def createRandomUintArr(w, h, nchannels=2):
 
 class ReadWriteFlowTest(unittest.TestCase):
     def setUp(self):
-        random.seed(datetime.now())
+        random.seed()
         self.qtimer = QuickTimer()
 
     def _run_read_write_test(self, slow_packing, slow_unpacking):
@@ -40,6 +39,10 @@ class ReadWriteFlowTest(unittest.TestCase):
         self.qtimer.end()
         self.assertTrue(np.allclose(flow, restored_flow), msg='For flow file %s' % flowfile)
 
+        if not slow_packing and not slow_unpacking:
+            mapped_flow = io_util.read_flow_mmap(flowfile)
+            np.testing.assert_array_equal(restored_flow, mapped_flow)
+
     def test_read_write(self):
         niterations = 10
 
@@ -57,7 +60,7 @@ class ReadWriteFlowTest(unittest.TestCase):
 
 class CompressTest(unittest.TestCase):
     def setUp(self):
-        random.seed(datetime.now())
+        random.seed()
         self.width = 25
         self.flows = [ createRandomArr(self.width, self.width) for x in range(7) ]
         self.arrays = [ createRandomArr(self.width, self.width, 3) for x in range(7) ]
@@ -74,6 +77,11 @@ class CompressTest(unittest.TestCase):
             io_util.write_flow(self.flows[i], flowfile)
         print('Wrote flows to %s' % flow_dir)
 
+        if sys.byteorder == 'little':
+            flows = io_util.read_flows(
+                [os.path.join(flow_dir, 'flow%02d.flo' % i) for i in range(len(self.flows))])
+            np.testing.assert_array_equal(np.stack(self.flows), flows)
+
         # Compress all flows
         zip_file = os.path.join(directory, 'flow_compr%d.zip' % rnum)
         io_util.compress_flows(flow_dir, zip_file)
@@ -85,6 +93,32 @@ class CompressTest(unittest.TestCase):
         for i in range(len(self.flows)):
             self.assertLess(np.sum(np.abs(self.flows[i] - flows[i])), 0.0001)
 
+        flows = list(io_util.iter_decompressed_flows(zip_file))
+        self.assertEqual(len(self.flows), len(flows))
+
+        for i in range(len(self.flows)):
+            self.assertLess(np.sum(np.abs(self.flows[i] - flows[i])), 0.0001)
+
+        # Stored and fast-deflated zips decompress the same way
+        for level in [0, 1]:
+            io_util.compress_flows(flow_dir, zip_file, compresslevel=level)
+            flows = io_util.decompress_flows(zip_file)
+            np.testing.assert_array_equal(np.stack(self.flows), np.stack(flows))
+
+    def test_compress_flows_mismatched_size(self):
+        rnum = random.randint(1, 10000)
+        directory = tempfile.gettempdir()
+        flow_dir = os.path.join(directory, 'flows_mismatched%d' % rnum)
+        os.mkdir(flow_dir)
+
+        io_util.write_flow(self.flows[0], os.path.join(flow_dir, 'flow00.flo'))
+        io_util.write_flow(createRandomArr(self.width + 1, self.width), os.path.join(flow_dir, 'flow01.flo'))
+
+        zip_file = os.path.join(directory, 'flow_mismatched%d.zip' % rnum)
+        with self.assertRaises(RuntimeError):
+            io_util.compress_flows(flow_dir, zip_file)
+        self.assertFalse(os.path.exists(zip_file))
+
     def test_compress_decompress_arrays(self):
         rnum = random.randint(1, 10000)
         directory = tempfile.gettempdir()
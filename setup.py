@@ -4,7 +4,7 @@ from setuptools import setup, find_packages
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
-reqs = ['numpy>=1.14', 'scikit-image>=0.15', 'scipy>=1.1', 'pandas>=0.25']
+reqs = ['numpy>=1.14', 'scikit-image>=0.15', 'scipy>=1.1']
 
 setup(
     name='creativeflow',